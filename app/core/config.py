@@ -1,5 +1,7 @@
+from functools import lru_cache
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Literal, Optional
+from typing import Any, Literal, Optional
 from app.prompts import prompt_texts
 
 class LLMSettings(BaseSettings):
@@ -19,14 +21,42 @@ class DatabaseSettings(BaseSettings):
 
 # New class for Prompt Configuration
 class PromptConfigSettings(BaseSettings):
-    """Holds configurations for prompt templates."""
+    """
+    Holds configurations for prompt templates.
+
+    general_system_template is a Jinja template: placeholders are written as
+    {{ chat_history }}, {{ user_query }} and {{ retrieved_context }}, and all
+    three are required. Old str.format-style {name} placeholders are rejected.
+    """
     general_system_template: str = prompt_texts.GENERAL_SYSTEM_PROMPT_TEMPLATE
 
+    @field_validator("general_system_template")
+    @classmethod
+    def _check_template_placeholders(cls, value: str) -> str:
+        # Imported here so loading the config does not import jinja2 unless a template is overridden
+        from jinja2 import TemplateSyntaxError, meta
+        from app.prompts.prompt_env import env
+
+        try:
+            variables = meta.find_undeclared_variables(env.parse(value))
+        except TemplateSyntaxError as e:
+            raise ValueError(f"general_system_template is not a valid Jinja template: {e}") from e
+        missing = sorted(set(prompt_texts.SYSTEM_PROMPT_VARIABLES) - variables)
+        if missing:
+            placeholders = ", ".join("{{ " + name + " }}" for name in missing)
+            raise ValueError(
+                f"general_system_template is missing the Jinja placeholders {placeholders} "
+                "(placeholders use {{ name }}, not {name})."
+            )
+        return value
+
 class AppSettings(BaseSettings):
-    llm: LLMSettings = LLMSettings()
-    vector_store: VectorStoreSettings = VectorStoreSettings()
-    database: DatabaseSettings = DatabaseSettings()
-    prompt_config: PromptConfigSettings = PromptConfigSettings()
+    # default_factory defers building (and env parsing of) nested settings
+    # until AppSettings itself is instantiated
+    llm: LLMSettings = Field(default_factory=LLMSettings)
+    vector_store: VectorStoreSettings = Field(default_factory=VectorStoreSettings)
+    database: DatabaseSettings = Field(default_factory=DatabaseSettings)
+    prompt_config: PromptConfigSettings = Field(default_factory=PromptConfigSettings)
     logging_level: str = "INFO"
 
     model_config = SettingsConfigDict(
@@ -34,11 +64,21 @@ class AppSettings(BaseSettings):
         extra='ignore'
     )
 
-# Global settings instance.
-settings = AppSettings()
+@lru_cache(maxsize=1)
+def get_settings() -> AppSettings:
+    """Returns the application settings, built from the environment on first call."""
+    return AppSettings()
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from app.core.config import settings` working without building
+    # the settings at import time.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Example usage (optional, for testing here)
 if __name__ == "__main__":
+    settings = get_settings()
     print("\nLoaded Application Settings:")
     print(f"  LLM Model: {settings.llm.model_identifier}")
     print(f"  LLM Temperature: {settings.llm.temperature}")
@@ -0,0 +1,48 @@
+"""
+This module holds the shared Jinja environment used to render prompt templates.
+
+Templates are compiled once and reused for every request, so filling the
+system prompt does not re-parse the template text on each RAG turn.
+"""
+
+from functools import lru_cache
+
+from jinja2 import DictLoader, Environment, Template
+
+from app.prompts import prompt_texts
+
+# Module-global singleton; cache_size=-1 keeps every compiled template alive.
+env = Environment(
+    loader=DictLoader({"system": prompt_texts.GENERAL_SYSTEM_PROMPT_TEMPLATE}),
+    autoescape=False,
+    keep_trailing_newline=True,
+    cache_size=-1
+)
+
+# Precompiled default system prompt.
+SYSTEM_TEMPLATE: Template = env.get_template("system")
+
+@lru_cache(maxsize=None)
+def get_compiled_template(template_source: str) -> Template:
+    """
+    Returns a compiled Template for the given template text.
+
+    The default system prompt resolves to the preloaded SYSTEM_TEMPLATE;
+    any other (e.g. configured) template is compiled on first use and cached.
+    """
+    if template_source == prompt_texts.GENERAL_SYSTEM_PROMPT_TEMPLATE:
+        return SYSTEM_TEMPLATE
+    return env.from_string(template_source)
+
+def render_system_prompt(chat_history: str, user_query: str, retrieved_context: str) -> str:
+    """
+    Fills the precompiled default system prompt.
+
+    Values are inserted verbatim, so braces in code samples are never
+    interpreted as template syntax.
+    """
+    return SYSTEM_TEMPLATE.render(
+        chat_history=chat_history,
+        user_query=user_query,
+        retrieved_context=retrieved_context
+    )
@@ -1,10 +1,17 @@
 """
-This module contains the raw text templates for prompts.
+This module contains the raw text templates for prompts, plus the canonical
+helper for turning chat history into the text inserted into them.
 """
 
+from typing import Dict, List
+
 # A comprehensive system prompt template for the prototype.
 # This incorporates role, task, rules, and placeholders for dynamic content including chat history,
 # the user's current query, and retrieved context.
+# Placeholders use Jinja syntax; the template is compiled once in app/prompts/prompt_env.py.
+# Overrides (PROMPT_CONFIG__GENERAL_SYSTEM_TEMPLATE) must use the same syntax and
+# all of SYSTEM_PROMPT_VARIABLES; app/core/config.py checks this at settings load.
+SYSTEM_PROMPT_VARIABLES = ("chat_history", "user_query", "retrieved_context")
 GENERAL_SYSTEM_PROMPT_TEMPLATE = """
 ### LLM Role & Primary Task
 You are a specialized PLC (Programmable Logic Controller) Technical Assistant and expert.
@@ -22,16 +29,16 @@ Your primary objective is to accurately answer the user's questions regarding PL
 ---
 ### Chat History (if any)
 This is the conversation so far:
-{chat_history}
+{{ chat_history }}
 ---
 
 ### User's Current Request
-User Query: {user_query}
+User Query: {{ user_query }}
 ---
 
 ### Supporting Information for the Current Query
 Retrieved Context:
-{retrieved_context}
+{{ retrieved_context }}
 ---
 
 Based on your role, the instructions, the chat history, the user's current query, and the retrieved supporting information, please provide your answer.
@@ -44,6 +51,20 @@ Based on your role, the instructions, the chat history, the user's current query
 # The actual user query is also passed here to form the user's turn.
 USER_MESSAGE_TEMPLATE = """{user_query}"""
 
+def format_chat_history(messages: List[Dict[str, str]]) -> str:
+    """
+    Builds the chat history block as one "role: content" line per turn.
+
+    This is the single place history text is assembled; callers should use it
+    instead of concatenating turns themselves. A single join allocates the
+    result once, unlike repeated `+=` which is quadratic in history length.
+    """
+    try:
+        # Fast path: well-formed turns always carry both keys.
+        return "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+    except KeyError:
+        return "\n".join([f"{m.get('role', 'unknown')}: {m.get('content', '')}" for m in messages])
+
 # The following templates are kept for reference or potential future use if the strategy changes,
 # but are not the primary ones with the above GENERAL_SYSTEM_PROMPT_TEMPLATE.
 
@@ -28,16 +28,33 @@ Embeddings Module responsibilities:
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
-import gc
+from typing import List, Dict, Any, Literal, Optional, Union, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
 import torch
-from langchain_community.embeddings import HuggingFaceEmbeddings, OllamaEmbeddings
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.quantization import quantize_embeddings
+
+logger = logging.getLogger(__name__)
+
+OutputDType = Literal["float32", "float16", "int8"]
 
 
 class EmbeddingModelConfig:
     """
     Configuration for an embedding model provider.
+    Validated and normalized once here; equal configs compare and hash equal
+    (when all kwargs are hashable), so providers can be shared per config.
     """
+    __slots__ = ('provider_type', 'model_identifier', 'provider_kwargs')
+
     def __init__(self, provider_type: str, model_identifier: str, **kwargs: Any):
         """
         Args:
@@ -45,14 +62,36 @@ class EmbeddingModelConfig:
             model_identifier: Name, path, or identifier of the model.
             **kwargs: Additional provider-specific arguments.
         """
+        if not isinstance(provider_type, str) or not provider_type:
+            raise ValueError("provider_type must be a non-empty string.")
+
         self.provider_type = provider_type.lower()
         self.model_identifier = model_identifier
         self.provider_kwargs = kwargs
 
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.provider_type, self.model_identifier,
+                tuple(sorted(self.provider_kwargs.items())))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EmbeddingModelConfig):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
 class BaseEmbeddingProvider(ABC):
     """
     Abstract base class for all embedding providers.
+
+    Note: embed_documents returns a contiguous 2-D numpy array of shape
+    (n_texts, dimension) in the provider's output dtype (float32 by default),
+    not a List[List[float]]; use as_list() where Python lists are required.
+    embed_query still returns a List[float].
     """
+    __slots__ = ('model_identifier', 'provider_kwargs', '_model', '_dimension')
+
     def __init__(self, model_identifier: str, **kwargs: Any):
         self.model_identifier = model_identifier
         self.provider_kwargs = kwargs
@@ -83,16 +122,36 @@ class BaseEmbeddingProvider(ABC):
         if not isinstance(text, str):
             raise TypeError("Input 'text' for embed_query must be a string.")
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds several queries at once, returning float vectors like embed_query.
+        Providers that can run one batched forward pass should override this.
+        """
+        return [self.embed_query(t) for t in texts]
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimensionality of the embeddings (loads the model if needed)."""
+        self._ensure_model_loaded()
+        return self._dimension
+
     @abstractmethod
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embeds a list of documents."""
+    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Embeds a list of documents into an array of shape (len(texts), dimension).
+        The list is validated once by EmbeddingService, not per provider call.
+        batch_size, if given, is the number of texts per forward pass for this call;
+        EmbeddingService passes its auto-tuned (and OOM-reduced) size here.
+        """
         self._ensure_model_loaded()
-        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
-            raise TypeError("Input 'texts' for embed_documents must be a list of strings.")
 
-    def cleanup(self) -> None:
+    def cleanup(self, release_gpu: bool = False) -> None:
         """
         Cleans up resources, e.g., releases model from memory.
+
+        Args:
+            release_gpu: Also return cached CUDA memory to the driver. This drains
+                         the allocator and is expensive; use it at shutdown only.
         
         TODO: test this within the RAG pipeline (to be modified accordingly).
         """
@@ -101,16 +160,55 @@ class BaseEmbeddingProvider(ABC):
             del self._model
             self._model = None
         
-        if torch and torch.cuda.is_available():
+        if release_gpu and torch and torch.cuda.is_available():
             torch.cuda.empty_cache()
-        gc.collect()
 
 class HuggingFaceEmbeddingProvider(BaseEmbeddingProvider):
-    """Embedding provider for models from Hugging Face."""
+    """
+    Embedding provider for models from Hugging Face.
+    Calls sentence-transformers directly (no LangChain wrapper) and runs the
+    model in FP16 on CUDA.
+
+    Document embeddings are returned in `output_dtype` ('float32', 'float16' or
+    'int8'). int8 uses sentence-transformers' scalar quantization with one fixed
+    set of per-dimension ranges for the provider's lifetime, so vectors from
+    different calls (batches, OOM retries, the disk cache) share one scale:
+        int8_ranges: (2, dimension) array of per-dimension [min; max].
+        calibration_texts: Texts embedded once at model load to derive the ranges.
+    Without either, normalized embeddings use the fixed range [-1, 1]. Store
+    `int8_ranges` alongside the vectors to quantize future additions the same way.
+    """
+    # Provider kwargs consumed here rather than forwarded to SentenceTransformer
+    _OWN_KWARGS = ('device', 'trust_remote_code', 'normalize_embeddings', 'batch_size',
+                   'fp16', 'output_dtype', 'compile', 'int8_ranges', 'calibration_texts')
+    _OUTPUT_DTYPES = ("float32", "float16", "int8")
+    __slots__ = ('batch_size', 'normalize_embeddings', 'output_dtype', 'int8_ranges')
+
+    def __init__(self, model_identifier: str, **kwargs: Any):
+        super().__init__(model_identifier, **kwargs)
+        self.batch_size: int = kwargs.get("batch_size", 32)
+        self.normalize_embeddings: bool = kwargs.get("normalize_embeddings", True)
+        self.output_dtype: OutputDType = kwargs.get("output_dtype", "float32")
+        if self.output_dtype not in self._OUTPUT_DTYPES:
+            raise ValueError(f"Unsupported output_dtype: '{self.output_dtype}'. "
+                             f"Supported types are: {list(self._OUTPUT_DTYPES)}")
+
+        self.int8_ranges: Optional[np.ndarray] = None
+        if self.output_dtype == "int8":
+            ranges = kwargs.get("int8_ranges")
+            if ranges is not None:
+                ranges = np.asarray(ranges, dtype=np.float32)
+                if ranges.ndim != 2 or ranges.shape[0] != 2:
+                    raise ValueError("int8_ranges must have shape (2, dimension).")
+                self.int8_ranges = ranges
+            elif not kwargs.get("calibration_texts") and not self.normalize_embeddings:
+                raise ValueError("int8 output of unnormalized embeddings needs "
+                                 "int8_ranges or calibration_texts.")
+
     def _load_model(self) -> None:
-        if HuggingFaceEmbeddings is None:
+        if SentenceTransformer is None:
             raise ImportError(
-                "HuggingFaceEmbeddings (langchain_community) is not installed. "
+                "sentence-transformers is not installed. "
                 "Please install it to use HuggingFaceEmbeddingProvider."
             )
 
@@ -118,79 +216,508 @@ class HuggingFaceEmbeddingProvider(BaseEmbeddingProvider):
         if device == "auto":
             device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        hf_model_kwargs = {'device': device}
-        if self.provider_kwargs.get("trust_remote_code"):
-            hf_model_kwargs['trust_remote_code'] = True
-        
-        # Pass through other specific kwargs for HuggingFaceEmbeddings
-        for k, v in self.provider_kwargs.items():
-            if k not in ['device', 'trust_remote_code', 'normalize_embeddings']:
-                 hf_model_kwargs[k] = v
-        
-        encode_kwargs = {
-            'normalize_embeddings': self.provider_kwargs.get(
-                "normalize_embeddings", True)}
-
-        self._model = HuggingFaceEmbeddings(
-            model_name=self.model_identifier,
-            model_kwargs=hf_model_kwargs,
-            encode_kwargs=encode_kwargs
+        # Pass through other specific kwargs for SentenceTransformer
+        st_kwargs = {k: v for k, v in self.provider_kwargs.items()
+                     if k not in self._OWN_KWARGS}
+
+        model = SentenceTransformer(
+            self.model_identifier,
+            device=device,
+            trust_remote_code=bool(self.provider_kwargs.get("trust_remote_code", False)),
+            **st_kwargs
         )
+        if device.startswith("cuda") and self.provider_kwargs.get("fp16", True):
+            model.half()
+        # Opt-in: compilation adds start-up time and is not supported by every model/Torch build
+        if device.startswith("cuda") and self.provider_kwargs.get("compile", False):
+            self._compile_transformer(model)
+
+        self._model = model
+        self._dimension = model.get_sentence_embedding_dimension()
+        if self.output_dtype == "int8":
+            self._calibrate_int8()
+
+    def _calibrate_int8(self) -> None:
+        """Fixes the int8 quantization ranges once, right after the model is loaded."""
+        if self.int8_ranges is None:
+            calibration_texts = self.provider_kwargs.get("calibration_texts")
+            if calibration_texts:
+                calibration = self._encode(list(calibration_texts))
+                self.int8_ranges = np.vstack([calibration.min(axis=0), calibration.max(axis=0)])
+            else:
+                # Unit-length vectors: every component lies in [-1, 1]
+                self.int8_ranges = np.vstack([np.full(self._dimension, -1.0, dtype=np.float32),
+                                              np.full(self._dimension, 1.0, dtype=np.float32)])
+        if self.int8_ranges.shape[1] != self._dimension:
+            raise ValueError(f"int8_ranges covers {self.int8_ranges.shape[1]} dimensions, "
+                             f"the model produces {self._dimension}.")
+
+    @property
+    def output_tag(self) -> str:
+        """
+        Identifies the stored vector format: output_dtype, plus a digest of the
+        int8 ranges, so cached vectors quantized on another scale are not reused.
+        """
+        if self.output_dtype != "int8":
+            return self.output_dtype
+        self._ensure_model_loaded()
+        digest = hashlib.blake2b(self.int8_ranges.tobytes(), digest_size=8).hexdigest()
+        return f"int8-{digest}"
+
+    @staticmethod
+    def _compile_transformer(model: Any) -> None:
+        """
+        Compiles the underlying Hugging Face encoder with torch.compile.
+        The encoder module is replaced in place so SentenceTransformer.encode uses it.
+        Compiled with dynamic shapes, since batch size and sequence length change
+        from call to call. torch.compile is lazy, so one forward pass is run here;
+        if it fails, the eager module is restored and a warning is logged.
+        """
+        transformer = model[0] if len(model) else None
+        if transformer is None or not hasattr(transformer, "auto_model"):
+            return
+        eager_model = transformer.auto_model
+        try:
+            transformer.auto_model = torch.compile(eager_model, dynamic=True)
+            with torch.inference_mode():
+                model.encode(["compile check"], convert_to_numpy=True, show_progress_bar=False)
+        except Exception as e:
+            transformer.auto_model = eager_model
+            logger.warning("torch.compile failed for %s; using the eager model: %s",
+                           type(eager_model).__name__, e)
+
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None) -> Any:
+        with torch.inference_mode():
+            return self._model.encode(
+                texts,
+                batch_size=batch_size or self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize_embeddings,
+                show_progress_bar=False
+            )
+
+    def _tokenize_pinned(self, texts: List[str]) -> Dict[str, Any]:
+        """Tokenizes a batch on the CPU into pinned host tensors for async H2D copies."""
+        features = self._model.tokenize(texts)
+        return {k: v.pin_memory() if isinstance(v, torch.Tensor) else v
+                for k, v in features.items()}
+
+    def _encode_pipelined(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Encodes texts on CUDA while overlapping CPU tokenization with the GPU forward pass.
+
+        A single worker thread tokenizes batch N+1 into pinned memory while batch N
+        is copied (non-blocking) and run on a dedicated CUDA stream. Texts are
+        processed longest-first, as in SentenceTransformer.encode, and written back
+        into a preallocated array in the original order.
+        """
+        device = self._model.device
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        batches = [sorted_texts[i:i + batch_size]
+                   for i in range(0, len(sorted_texts), batch_size)]
+
+        out = np.empty((len(texts), self._dimension), dtype=np.float32)
+        stream = torch.cuda.Stream(device=device)
+        start = 0
+        with ThreadPoolExecutor(max_workers=1) as executor, torch.inference_mode():
+            pending = executor.submit(self._tokenize_pinned, batches[0])
+            for batch_idx, batch in enumerate(batches):
+                features = pending.result()
+                if batch_idx + 1 < len(batches):
+                    pending = executor.submit(self._tokenize_pinned, batches[batch_idx + 1])
+
+                with torch.cuda.stream(stream):
+                    features = {k: v.to(device, non_blocking=True) if isinstance(v, torch.Tensor) else v
+                                for k, v in features.items()}
+                    embeddings = self._model.forward(features)["sentence_embedding"]
+                    if self.normalize_embeddings:
+                        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+                    # .cpu() synchronizes with the stream before the host reads the batch
+                    batch_out = embeddings.float().cpu().numpy()
+
+                out[order[start:start + len(batch)]] = batch_out
+                start += len(batch)
+        return out
 
     def embed_query(self, text: str) -> List[float]:
         super().embed_query(text)
-        return self._model.embed_query(text)
+        return self._encode([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        self._ensure_model_loaded()
+        # Always float32: query vectors are not subject to output_dtype
+        return self._encode(texts).tolist()
+
+    def _to_output_dtype(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.output_dtype == "float16":
+            return embeddings.astype(np.float16)
+        if self.output_dtype == "int8":
+            return quantize_embeddings(embeddings, precision="int8", ranges=self.int8_ranges)
+        return embeddings
+
+    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        super().embed_documents(texts, batch_size)
+        batch_size = batch_size or self.batch_size
+        if self._model.device.type == "cuda" and len(texts) > batch_size:
+            return self._to_output_dtype(self._encode_pipelined(texts, batch_size))
+        return self._to_output_dtype(self._encode(texts, batch_size))
+
+class EmbeddingCache:
+    """
+    Persistent key-value store of document embeddings, backed by SQLite.
+    Keys combine the model identifier, output dtype and a content hash, so
+    unchanged documents are not re-embedded across indexing runs.
+    """
+    _SQL_VARIABLE_LIMIT = 500
+    __slots__ = ('_lock', '_conn')
+
+    def __init__(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "embeddings.sqlite3"),
+                                     check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_identifier: str, output_dtype: str, text: str) -> str:
+        # blake2b: fast, stdlib, and no cryptographic strength needed here
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{model_identifier}:{output_dtype}:{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for whichever of the keys are present."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(keys), self._SQL_VARIABLE_LIMIT):
+                chunk = keys[i:i + self._SQL_VARIABLE_LIMIT]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                )
+                for key, dtype, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=dtype)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """Stores (or replaces) the given vectors."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)",
+                [(k, v.dtype.str, v.tobytes()) for k, v in items.items()]
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class AsyncCoalescingEmbedder:
+    """
+    Coalesces concurrent single-query embedding requests into batched forward passes.
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        super().embed_documents(texts)
-        return self._model.embed_documents(texts)
+    Each awaiting caller enqueues its query; a background task collects up to
+    `max_batch` queries or waits at most `max_wait_ms` after the first one, then
+    embeds the whole group with one provider call (run in a worker thread so the
+    event loop is not blocked) and resolves every caller's future.
+
+    The queue and task are created per running event loop, so the embedder can be
+    used from successive asyncio.run() calls or from loops in several threads.
+    """
+    __slots__ = ('provider', 'max_batch', 'max_wait', '_workers', '_lock')
+
+    def __init__(self, provider: BaseEmbeddingProvider, max_batch: int = 64,
+                 max_wait_ms: float = 5.0):
+        if not isinstance(max_batch, int) or max_batch <= 0:
+            raise ValueError("max_batch must be a positive integer.")
+        self.provider = provider
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        # Event loop -> (queue, batching task) living on that loop
+        self._workers: Dict[asyncio.AbstractEventLoop, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        self._lock = threading.Lock()
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embeds a query, sharing the forward pass with concurrent callers."""
+        if not isinstance(text, str):
+            raise TypeError("Input 'text' for embed_query must be a string.")
+        loop = asyncio.get_running_loop()
+        worker = self._workers.get(loop)
+        if worker is None or worker[1].done():
+            queue: asyncio.Queue = asyncio.Queue()
+            worker = (queue, loop.create_task(self._run(queue)))
+            with self._lock:
+                # Drop the workers of loops that have since been closed
+                for stale_loop in [l for l in self._workers if l.is_closed()]:
+                    del self._workers[stale_loop]
+                self._workers[loop] = worker
+        future = loop.create_future()
+        await worker[0].put((text.strip(), future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        items: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                items = [await queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(items) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                texts = [text for text, _ in items]
+                try:
+                    embeddings = await loop.run_in_executor(None, self.provider.embed_queries, texts)
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), embedding in zip(items, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+        except asyncio.CancelledError:
+            # Callers still waiting on this task would otherwise never be resolved
+            while not queue.empty():
+                items.append(queue.get_nowait())
+            for _, future in items:
+                if not future.done():
+                    future.cancel()
+            raise
+
+    async def aclose(self) -> None:
+        """Stops the background batching task of the running event loop."""
+        with self._lock:
+            worker = self._workers.pop(asyncio.get_running_loop(), None)
+        if worker is not None:
+            worker[1].cancel()
+            try:
+                await worker[1]
+            except asyncio.CancelledError:
+                pass
+
+    def close(self) -> None:
+        """
+        Stops the batching tasks of all event loops; callable from synchronous code.
+        Requests still queued are cancelled.
+        """
+        with self._lock:
+            workers = list(self._workers.items())
+            self._workers.clear()
+        for loop, (_, task) in workers:
+            if not task.done() and not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
 
 class EmbeddingService:
     """
     Facade for using embedding providers. Handles batching and provides a consistent interface.
+
+    In a long-lived server, create one service at startup (preload=True keeps
+    the model resident and warmed up) and do not call cleanup() or use the
+    context manager per request; reloading the model is far more expensive
+    than keeping it in memory between queries.
     """
-    def __init__(self, provider: BaseEmbeddingProvider, batch_size: int = 32):
+    # Fraction of free VRAM the auto-tuned batch may occupy
+    AUTO_BATCH_VRAM_FRACTION = 0.7
+    # Rough activation footprint of one sequence during the forward pass
+    AUTO_BATCH_BYTES_PER_ITEM = 4 * 1024 * 1024
+    AUTO_BATCH_MAX = 1024
+    DEFAULT_CPU_BATCH_SIZE = 32
+    # Forward-pass batches per provider call, so the provider can overlap tokenization
+    # of one batch with the next; an OOM retry repeats at most this many batches
+    BATCHES_PER_CALL = 4
+    __slots__ = ('provider', 'batch_size', '_query_cache', '_disk_cache', '_coalescer')
+
+    def __init__(self, provider: BaseEmbeddingProvider, batch_size: Union[int, str] = "auto",
+                 query_cache_size: int = 1024, cache_dir: Optional[str] = None,
+                 preload: bool = True):
+        """
+        Args:
+            provider: The embedding provider to delegate to.
+            batch_size: Number of documents per forward pass, or 'auto' to size
+                        batches from the free VRAM (32 on CPU). Overrides the
+                        provider's own batch_size for embed_documents.
+            query_cache_size: Maximum number of query embeddings kept in the LRU cache.
+            cache_dir: Optional directory for a persistent document-embedding cache.
+                       Documents already embedded by the same model are not re-embedded.
+            preload: Load the model and run a warm-up query immediately, so the
+                     first real request does not pay the model load.
+        """
         if not isinstance(provider, BaseEmbeddingProvider):
             raise TypeError("Provider must be an instance of BaseEmbeddingProvider.")
-        if not isinstance(batch_size, int) or batch_size <= 0:
-            raise ValueError("batch_size must be a positive integer.")
+        if batch_size == "auto":
+            batch_size = self._pick_batch_size()
+        elif not isinstance(batch_size, int) or batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer or 'auto'.")
             
         self.provider = provider
         self.batch_size = batch_size
+        # LRU over (model_identifier, normalized query) -> embedding
+        self._query_cache = functools.lru_cache(maxsize=query_cache_size)(
+            self._embed_query_uncached)
+        self._disk_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(cache_dir) if cache_dir else None)
+        self._coalescer: Optional[AsyncCoalescingEmbedder] = None
+
+        if preload:
+            self.warmup()
+
+    def warmup(self) -> None:
+        """Loads the model and runs one dummy query so weights and CUDA kernels are ready."""
+        self.provider.load()
+        # Bypass the query cache so the warm-up text is not stored
+        self.provider.embed_query("warmup")
+
+    def _embed_query_uncached(self, model_identifier: str, text: str) -> Tuple[float, ...]:
+        """Runs the provider for a query; model_identifier only takes part in the cache key."""
+        return tuple(self.provider.embed_query(text))
 
     def embed_query(self, query: str) -> List[float]:
-        """Embeds a single query using the configured provider."""
-        # Input validation is handled by the provider's embed_query method
-        return self.provider.embed_query(query)
+        """
+        Embeds a single query using the configured provider.
+        Repeated queries are served from an in-memory LRU cache.
+        """
+        if not isinstance(query, str):
+            raise TypeError("Input 'text' for embed_query must be a string.")
+        # Return a fresh list so callers cannot mutate the cached entry
+        return list(self._query_cache(self.provider.model_identifier, query.strip()))
+
+    async def embed_query_async(self, query: str) -> List[float]:
+        """
+        Embeds a single query from async code. Concurrent calls are micro-batched
+        into one forward pass (see AsyncCoalescingEmbedder).
+        """
+        if self._coalescer is None:
+            self._coalescer = AsyncCoalescingEmbedder(self.provider)
+        return await self._coalescer.embed_query(query)
 
-    def embed_documents(self, documents: List[str]) -> List[List[float]]:
-        """Embeds a list of documents, handling batching if necessary."""
-        # Input validation for the list itself
+    def embed_documents(self, documents: List[str]) -> np.ndarray:
+        """
+        Embeds a list of documents, handling batching if necessary.
+        Duplicate documents are embedded once and the result is reused.
+
+        Returns:
+            An array of shape (len(documents), dimension) in the provider's output dtype.
+        """
+        # Input validation happens once here, at the service boundary
         if not isinstance(documents, list):
             raise TypeError("Input 'documents' must be a list.")
         if not documents: # Handle empty list early
-            return []
-
-        if len(documents) <= self.batch_size:
-            return self.provider.embed_documents(documents)
+            return np.empty((0, 0), dtype=np.float32)
+        if type(documents[0]) is not str or (
+                __debug__ and not all(type(d) is str for d in documents)):
+            raise TypeError("Input 'documents' must be a list of strings.")
+
+        # First-occurrence index per distinct document (dict keeps insertion order)
+        unique_index: Dict[str, int] = {}
+        for doc in documents:
+            unique_index.setdefault(doc, len(unique_index))
+        unique_documents = list(unique_index)
+        if len(unique_documents) < len(documents) and logger.isEnabledFor(logging.DEBUG):
+            skipped_bytes = (sum(len(d.encode("utf-8")) for d in documents)
+                             - sum(len(d.encode("utf-8")) for d in unique_documents))
+            logger.debug("Skipped %d duplicate documents (%d bytes) before embedding.",
+                         len(documents) - len(unique_documents), skipped_bytes)
+
+        if self._disk_cache is None:
+            unique_embeddings = self._embed_documents_batched(unique_documents)
         else:
-            return self._embed_documents_batched(documents)
-
-    def _embed_documents_batched(self, documents: List[str]) -> List[List[float]]:
-        all_embeddings: List[List[float]] = []
-        for i in range(0, len(documents), self.batch_size):
-            batch_documents = documents[i:i + self.batch_size]
-            batch_embeddings = self.provider.embed_documents(batch_documents)
-            all_embeddings.extend(batch_embeddings)
-            
-            # Optional: Aggressive memory clearing for GPU models after each batch
-            # TODO: clean up may be needed - must be check within the RAG pipeline.
+            unique_embeddings = self._embed_documents_cached(unique_documents)
+
+        if len(unique_documents) == len(documents):
+            return unique_embeddings
+        return unique_embeddings[[unique_index[doc] for doc in documents]]
+
+    def _embed_documents_cached(self, documents: List[str]) -> np.ndarray:
+        """
+        Serves documents from the persistent cache and embeds only the misses.
+        """
+        output_dtype = getattr(self.provider, "output_tag", None) or \
+            getattr(self.provider, "output_dtype", "float32")
+        keys = [EmbeddingCache.make_key(self.provider.model_identifier, output_dtype, doc)
+                for doc in documents]
+        cached = self._disk_cache.get_many(keys)
+        missing_idx = [i for i, key in enumerate(keys) if key not in cached]
+        if not missing_idx:
+            return np.stack([cached[key] for key in keys])
+
+        new_embeddings = self._embed_documents_batched([documents[i] for i in missing_idx])
+        self._disk_cache.put_many(
+            {keys[i]: new_embeddings[j] for j, i in enumerate(missing_idx)})
+        if len(missing_idx) == len(documents):
+            return new_embeddings
+
+        out = np.empty((len(documents), new_embeddings.shape[1]), dtype=new_embeddings.dtype)
+        out[missing_idx] = new_embeddings
+        for i, key in enumerate(keys):
+            if key in cached:
+                out[i] = cached[key]
+        return out
+
+    @classmethod
+    def _pick_batch_size(cls) -> int:
+        """
+        Picks the largest power-of-two batch size that fits in a fraction of the
+        currently free VRAM. Falls back to a small fixed size on CPU.
+        """
+        if not torch.cuda.is_available():
+            return cls.DEFAULT_CPU_BATCH_SIZE
+
+        free_bytes, _ = torch.cuda.mem_get_info()
+        budget_items = int(free_bytes * cls.AUTO_BATCH_VRAM_FRACTION) // cls.AUTO_BATCH_BYTES_PER_ITEM
+        batch_size = cls.DEFAULT_CPU_BATCH_SIZE
+        while batch_size * 2 <= min(budget_items, cls.AUTO_BATCH_MAX):
+            batch_size *= 2
+        return batch_size
+
+    def _embed_documents_batched(self, documents: List[str]) -> np.ndarray:
+        """
+        Embeds documents chunk by chunk into a preallocated result array. Each
+        provider call gets BATCHES_PER_CALL forward passes of self.batch_size texts.
+        On CUDA out-of-memory the batch size is halved and the chunk retried.
+        """
+        all_embeddings: Optional[np.ndarray] = None
+        i = 0
+        while i < len(documents):
+            batch_documents = documents[i:i + self.batch_size * self.BATCHES_PER_CALL]
+            try:
+                batch_embeddings = self.provider.embed_documents(batch_documents, self.batch_size)
+            except torch.cuda.OutOfMemoryError:
+                if self.batch_size == 1:
+                    raise
+                torch.cuda.empty_cache()
+                self.batch_size = max(1, self.batch_size // 2)
+                continue
+            if all_embeddings is None:
+                # Shape and dtype follow the provider's output
+                all_embeddings = np.empty((len(documents), batch_embeddings.shape[1]),
+                                          dtype=batch_embeddings.dtype)
+            all_embeddings[i:i + len(batch_documents)] = batch_embeddings
+            i += len(batch_documents)
 
         return all_embeddings
 
-    def cleanup(self) -> None:
-        """Cleans up the underlying embedding provider and its resources."""
-        self.provider.cleanup()
+    def cleanup(self, release_gpu: bool = False) -> None:
+        """
+        Cleans up the underlying embedding provider and its resources.
+        Pass release_gpu=True to also empty the CUDA cache (process shutdown).
+        """
+        self._query_cache.cache_clear()
+        if self._coalescer is not None:
+            self._coalescer.close()
+            self._coalescer = None
+        self.provider.cleanup(release_gpu=release_gpu)
 
     def __enter__(self) -> 'EmbeddingService':
         """Context manager entry."""
@@ -198,30 +725,54 @@ class EmbeddingService:
         return self
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        """Context manager exit: ensures cleanup."""
-        self.cleanup()
+        """
+        Context manager exit: ensures cleanup, including releasing GPU memory.
+        Intended for scripts and batch jobs, not for wrapping individual requests.
+        """
+        self.cleanup(release_gpu=True)
+
+def as_list(embeddings: np.ndarray) -> List[List[float]]:
+    """
+    Converts a (n, dim) embedding array to nested Python lists.
+    Only for consumers that cannot take numpy arrays; prefer passing the array through.
+    """
+    return np.asarray(embeddings, dtype=np.float32).tolist()
 
 PROVIDER_REGISTRY: Dict[str, type[BaseEmbeddingProvider]] = {
     "huggingface": HuggingFaceEmbeddingProvider
 }
 
-def create_embedding_provider(config: EmbeddingModelConfig) -> BaseEmbeddingProvider:
+def _build_embedding_provider(config: EmbeddingModelConfig) -> BaseEmbeddingProvider:
+    try:
+        provider_class = PROVIDER_REGISTRY[config.provider_type]
+    except KeyError:
+        raise ValueError(f"Unsupported provider type: '{config.provider_type}'. "
+                         f"Supported types are: {list(PROVIDER_REGISTRY.keys())}") from None
+    return provider_class(model_identifier=config.model_identifier, **config.provider_kwargs)
+
+_build_shared_embedding_provider = functools.lru_cache(maxsize=None)(_build_embedding_provider)
+
+def create_embedding_provider(config: EmbeddingModelConfig,
+                              shared: bool = False) -> BaseEmbeddingProvider:
     """
     Factory function to create an instance of an embedding provider.
     Args:
         config: EmbeddingModelConfig object.
+        shared: Return the same provider instance for equal configs, so the model
+                is loaded once per process. Ignored if the config has unhashable kwargs.
     Returns:
         An instance of a BaseEmbeddingProvider.
     """
     if not isinstance(config, EmbeddingModelConfig):
         raise TypeError("config must be an instance of EmbeddingModelConfig.")
 
-    provider_class = PROVIDER_REGISTRY.get(config.provider_type)
-    if not provider_class:
-        raise ValueError(f"Unsupported provider type: '{config.provider_type}'. "
-                         f"Supported types are: {list(PROVIDER_REGISTRY.keys())}")
-    
-    return provider_class(model_identifier=config.model_identifier, **config.provider_kwargs)
+    if shared:
+        try:
+            hash(config)
+        except TypeError:
+            return _build_embedding_provider(config)
+        return _build_shared_embedding_provider(config)
+    return _build_embedding_provider(config)
 
 if __name__ == '__main__':
     print("--- Embedding Module Demonstration ---")
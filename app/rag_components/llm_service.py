@@ -27,14 +27,23 @@ LLMService Module Responsibilities:
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, TypedDict, Type
+from typing import AsyncIterator, List, Dict, Any, Optional, TypedDict, Type
+import functools
+import threading
+import time
 from langchain_ollama import ChatOllama
+from pydantic import TypeAdapter, ValidationError
+from typing_extensions import TypedDict as ValidatedTypedDict
 
 
 class LLMProviderConfig:
     """
     Configuration for an LLM provider.
+    Validated and normalized once here; equal configs compare and hash equal
+    (when all kwargs are hashable), so providers can be shared per config.
     """
+    __slots__ = ('provider_type', 'provider_kwargs', 'model_name')
+
     def __init__(self, provider_type: str, **kwargs: Any):
         """
         Args:
@@ -48,6 +57,17 @@ class LLMProviderConfig:
         self.provider_kwargs = kwargs
         self.model_name: Optional[str] = kwargs.get("model_name")
 
+    def _key(self) -> tuple:
+        return (self.provider_type, tuple(sorted(self.provider_kwargs.items())))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LLMProviderConfig):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
 class GeneratedOutput(TypedDict):
     """
     Standardized format for LLM-generated output.
@@ -57,25 +77,75 @@ class GeneratedOutput(TypedDict):
     usage_metadata: Optional[Dict[str, Any]] # e.g., token counts, finish reason
     error: Optional[str] # Error message if generation failed
 
+class ChatMessage(ValidatedTypedDict):
+    """A single chat turn passed to chat_completion."""
+    role: str
+    content: str
+
+# Built once; validates a whole message list in pydantic-core.
+_CHAT_MESSAGES_ADAPTER = TypeAdapter(List[ChatMessage])
+
+def validate_chat_messages(messages: Any) -> None:
+    """Raises TypeError unless messages is a list of dicts with str 'role' and 'content'."""
+    try:
+        _CHAT_MESSAGES_ADAPTER.validate_python(messages, strict=True)
+    except ValidationError as e:
+        raise TypeError("messages must be a list of dictionaries, "
+                        f"each with 'role' and 'content' keys: {e}") from None
+
 class BaseLLMProvider(ABC):
     """
     Abstract base class for all LLM providers.
+
+    The underlying client is created lazily on first use of `llm_client`.
+    Recognised config kwargs:
+        eager: Build (and warm up) the client at construction time.
+        idle_threshold: Seconds of inactivity after which the client is dropped
+                        and rebuilt on the next call.
     """
+    # Config kwargs consumed by the base class, not forwarded to the client
+    BASE_CONFIG_KEYS = ("model_name", "provider_type", "eager", "idle_threshold")
+    __slots__ = ('config', 'model_name', 'idle_threshold', '_llm_client',
+                 '_last_used', '_client_lock')
+
     def __init__(self, config: LLMProviderConfig):
         if not isinstance(config, LLMProviderConfig):
             raise TypeError("config must be an instance of LLMProviderConfig.")
         self.config = config
         self.model_name = config.model_name
-        self.llm_client: Any = self._initialize_llm()
+        self.idle_threshold: Optional[float] = config.provider_kwargs.get("idle_threshold")
+        self._llm_client: Any = None
+        self._last_used: float = 0.0
+        self._client_lock = threading.Lock()
+
+        if config.provider_kwargs.get("eager", False):
+            self._warm_up()
+
+    @property
+    def llm_client(self) -> Any:
+        """Returns the LLM client, creating it on first access or after an idle eviction."""
+        with self._client_lock:
+            now = time.monotonic()
+            if (self._llm_client is not None and self.idle_threshold is not None
+                    and now - self._last_used > self.idle_threshold):
+                self._llm_client = None
+            if self._llm_client is None:
+                self._llm_client = self._initialize_llm()
+            self._last_used = now
+            return self._llm_client
 
     @abstractmethod
     def _initialize_llm(self) -> Any:
         """
         Initializes and returns the underlying LLM client or model object.
-        This method is called during provider instantiation.
+        This method is called on first access to `llm_client`.
         """
         pass
 
+    def _warm_up(self) -> None:
+        """Builds the client ahead of the first request. Providers may extend this."""
+        _ = self.llm_client
+
     @abstractmethod
     def generate(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> GeneratedOutput:
         """
@@ -95,6 +165,19 @@ class BaseLLMProvider(ABC):
         if params is not None and not isinstance(params, dict):
             raise TypeError("params must be a dictionary if provided.")
 
+    def generate_batch(self, prompts: List[str],
+                       params: Optional[Dict[str, Any]] = None) -> List[GeneratedOutput]:
+        """
+        Generates text for several prompts sharing the same runtime parameters.
+
+        Default implementation calls generate() once per prompt; providers whose
+        client accepts batched requests should override it.
+
+        Returns:
+            One GeneratedOutput per prompt, in input order.
+        """
+        return [self.generate(prompt, params) for prompt in prompts]
+
     @abstractmethod
     def chat_completion(
         self,
@@ -104,6 +187,7 @@ class BaseLLMProvider(ABC):
         """
         Generates a response based on a list of chat messages.
         Each message is a dict with "role" (e.g., "system", "user", "assistant") and "content".
+        The message list is validated by LLMService before it reaches the provider.
 
         Args:
             messages: A list of message dictionaries.
@@ -112,10 +196,6 @@ class BaseLLMProvider(ABC):
         Returns:
             A GeneratedOutput dictionary.
         """
-        if not isinstance(messages, list) or not all(
-            isinstance(m, dict) and "role" in m and "content" in m for m in messages
-        ):
-            raise TypeError("messages must be a list of dictionaries, each with 'role' and 'content' keys.")
         if params is not None and not isinstance(params, dict):
             raise TypeError("params must be a dictionary if provided.")
         
@@ -126,19 +206,40 @@ class BaseLLMProvider(ABC):
             "error": f"{self.__class__.__name__}: is not implemented."
         }
 
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streams the response to a list of chat messages as text chunks.
+
+        Default implementation yields the complete chat_completion text as a single
+        chunk; providers with native streaming should override it.
+
+        Raises:
+            RuntimeError: If generation fails.
+        """
+        output = self.chat_completion(messages, params)
+        if output["error"]:
+            raise RuntimeError(output["error"])
+        yield output["text"]
+
     def cleanup(self) -> None:
         """
         Performs any necessary cleanup for the LLM client (e.g., closing connections).
-        Default implementation does nothing.
+        Default implementation drops the client; it is rebuilt on next use.
         """
-        self.llm_client = None
-        pass
+        with self._client_lock:
+            self._llm_client = None
 
 class OllamaLLMProvider(BaseLLMProvider):
     """
     LLM provider for Ollama models using the langchain-ollama package.
     Uses ChatOllama for both generate and chat_completion methods.
     """
+    __slots__ = ()
+
     def _initialize_llm(self) -> Any:
         if not self.model_name:
             raise ValueError("model_name must be specified in " \
@@ -146,18 +247,22 @@ class OllamaLLMProvider(BaseLLMProvider):
 
         ollama_params = {
             k: v for k, v in self.config.provider_kwargs.items()
-            if k not in ["model_name", "provider_type"]
+            if k not in self.BASE_CONFIG_KEYS
         }
         try:
             # Using ChatOllama as the client
-            chat_model = ChatOllama(model=self.model_name, **ollama_params)
-           
-            chat_model.invoke([{"role": "user", "content": "Hi"}], config={"max_tokens": 5})
-            return chat_model
-        
+            return ChatOllama(model=self.model_name, **ollama_params)
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize Ollama model "
+                               f"'{self.model_name}' via ChatOllama: {e}")
+
+    def _warm_up(self) -> None:
+        """Builds the client and sends a tiny request so the model is loaded by Ollama."""
+        try:
+            self.llm_client.invoke([{"role": "user", "content": "Hi"}], config={"max_tokens": 5})
         except Exception as e:
-            raise RuntimeError(f"Failed to initialize or" /
-                               "connect to Ollama model '{self.model_name}' via ChatOllama: {e}")
+            raise RuntimeError(f"Failed to connect to Ollama model "
+                               f"'{self.model_name}' via ChatOllama: {e}")
 
     def generate(self, prompt: str, 
                  params: Optional[Dict[str, Any]] = None) -> GeneratedOutput:
@@ -167,20 +272,57 @@ class OllamaLLMProvider(BaseLLMProvider):
         messages = [{"role": "user", "content": prompt}]
         return self.chat_completion(messages, params)
 
+    def generate_batch(self, prompts: List[str],
+                       params: Optional[Dict[str, Any]] = None) -> List[GeneratedOutput]:
+        for prompt in prompts:
+            BaseLLMProvider.generate(self, prompt, params)
+        try:
+            llm_client = self.llm_client
+        except Exception as e:
+            return [{
+                "text": "", "model_name": self.model_name, "usage_metadata": None,
+                "error": f"Ollama client not initialized: {str(e)}"
+            } for _ in prompts]
+
+        # Runnable.batch sends the requests concurrently; failures are returned per prompt
+        responses = llm_client.batch(
+            [[{"role": "user", "content": prompt}] for prompt in prompts],
+            config=params,
+            return_exceptions=True
+        )
+        outputs: List[GeneratedOutput] = []
+        for response in responses:
+            if isinstance(response, Exception):
+                outputs.append({
+                    "text": "", "model_name": self.model_name, "usage_metadata": None,
+                    "error": f"Ollama generate_batch error: {str(response)}"
+                })
+                continue
+            outputs.append({
+                "text": response.content if hasattr(response, 'content') else str(response),
+                "model_name": self.model_name,
+                "usage_metadata": getattr(response, 'usage_metadata', None),
+                "error": None
+            })
+        return outputs
+
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
         params: Optional[Dict[str, Any]] = None
     ) -> GeneratedOutput:
         super().chat_completion(messages, params) # Base class checks
-        if not self.llm_client: # Should have been initialized
-             return {
+        try:
+            # Client is created on first use
+            llm_client = self.llm_client
+        except Exception as e:
+            return {
                 "text": "", "model_name": self.model_name, "usage_metadata": None,
-                "error": "Ollama client not initialized."
+                "error": f"Ollama client not initialized: {str(e)}"
             }
         try:
             # Langchain's invoke can take a 'config' dict for runtime parameters
-            response_content = self.llm_client.invoke(messages, config=params)
+            response_content = llm_client.invoke(messages, config=params)
             
             # response_content from ChatOllama is typically AIMessage, we need its content
             text_response = response_content.content if hasattr(response_content, 'content') else str(response_content)
@@ -206,10 +348,27 @@ class OllamaLLMProvider(BaseLLMProvider):
                 "error": f"Ollama chat_completion error: {str(e)}"
             }
 
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Streams ChatOllama output token chunks as they are generated."""
+        if params is not None and not isinstance(params, dict):
+            raise TypeError("params must be a dictionary if provided.")
+        try:
+            async for chunk in self.llm_client.astream(messages, config=params):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            raise RuntimeError(f"Ollama stream_chat_completion error: {str(e)}") from e
+
 class LLMService:
     """
     Facade for using LLM providers. Provides a consistent interface for LLM interactions.
     """
+    __slots__ = ('provider',)
+
     def __init__(self, provider: BaseLLMProvider):
         if not isinstance(provider, BaseLLMProvider):
             raise TypeError("Provider must be an instance of BaseLLMProvider.")
@@ -229,6 +388,24 @@ class LLMService:
         """
         return self.provider.generate(prompt, params)
 
+    def generate_batch(self, prompts: List[str],
+                       params: Optional[Dict[str, Any]] = None) -> List[GeneratedOutput]:
+        """
+        Generates text for several prompts in one provider call.
+
+        Args:
+            prompts: The input prompt strings.
+            params: Optional dictionary of runtime parameters, shared by all prompts.
+
+        Returns:
+            One GeneratedOutput dictionary per prompt, in input order.
+        """
+        if not isinstance(prompts, list):
+            raise TypeError("prompts must be a list of strings.")
+        if not prompts:
+            return []
+        return self.provider.generate_batch(prompts, params)
+
     def generate_chat_response(
         self,
         messages: List[Dict[str, str]],
@@ -244,8 +421,29 @@ class LLMService:
         Returns:
             A GeneratedOutput dictionary.
         """
+        validate_chat_messages(messages)
         return self.provider.chat_completion(messages, params)
 
+    async def stream_chat_response(
+        self,
+        messages: List[Dict[str, str]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streams a chat response chunk by chunk, so callers can start post-processing
+        (or display) before generation finishes.
+
+        Args:
+            messages: A list of message dictionaries.
+            params: Optional dictionary of runtime parameters for the LLM.
+
+        Yields:
+            Text chunks in generation order.
+        """
+        validate_chat_messages(messages)
+        async for chunk in self.provider.stream_chat_completion(messages, params):
+            yield chunk
+
     def cleanup_provider(self) -> None:
         """Cleans up resources used by the LLM provider, if applicable."""
         self.provider.cleanup()
@@ -257,20 +455,38 @@ LLM_PROVIDER_REGISTRY: Dict[str, Type[BaseLLMProvider]] = {
     # Future providers like "openai": OpenAILLMProvider can be added here
 }
 
-def create_llm_provider(config: LLMProviderConfig) -> BaseLLMProvider:
+def _build_llm_provider(config: LLMProviderConfig) -> BaseLLMProvider:
+    try:
+        provider_class = LLM_PROVIDER_REGISTRY[config.provider_type]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported LLM provider type: '{config.provider_type}'. "
+            f"Supported types are: {list(LLM_PROVIDER_REGISTRY.keys())}"
+        ) from None
+    return provider_class(config)
+
+_build_shared_llm_provider = functools.lru_cache(maxsize=None)(_build_llm_provider)
+
+def create_llm_provider(config: LLMProviderConfig, shared: bool = False) -> BaseLLMProvider:
     """
     Factory function to create an instance of an LLM provider.
+
+    Args:
+        config: LLMProviderConfig object.
+        shared: Return the same provider instance for equal configs, so the client
+                is created (and warmed up) once per process. Ignored if the config
+                has unhashable kwargs.
     """
     if not isinstance(config, LLMProviderConfig):
         raise TypeError("config must be an instance of LLMProviderConfig.")
 
-    provider_class = LLM_PROVIDER_REGISTRY.get(config.provider_type)
-    if not provider_class:
-        raise ValueError(
-            f"Unsupported LLM provider type: '{config.provider_type}'. "
-            f"Supported types are: {list(LLM_PROVIDER_REGISTRY.keys())}"
-        )
-    return provider_class(config)
+    if shared:
+        try:
+            hash(config)
+        except TypeError:
+            return _build_llm_provider(config)
+        return _build_shared_llm_provider(config)
+    return _build_llm_provider(config)
 
 if __name__ == '__main__':
     print("--- LLMService Module Demonstration (Updated Ollama Provider) ---")
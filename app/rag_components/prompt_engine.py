@@ -4,12 +4,16 @@ Simple Prompt Formatter Module: Simplified approach for prompt generation.
 Responsibilities:
 - Provides a registry-based system for different prompt strategies.
 - Formats chat history, retrieved context, and user queries into a single prompt string.
-- Uses template-based approach with placeholder substitution.
+- Uses precompiled Jinja templates for placeholder substitution.
 """
 
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import List, Dict, Optional, Type
 
+from app.prompts.prompt_env import get_compiled_template
+from app.prompts.prompt_texts import format_chat_history
+
 class BasePromptComponent(ABC):
     """Abstract base class for prompt generation components."""
     
@@ -39,6 +43,11 @@ class BasePromptComponent(ABC):
 class GeneralUsePrompt(BasePromptComponent):
     """General purpose prompt formatter for PLC assistant."""
     
+    def __init__(self, prompt_template: str):
+        super().__init__(prompt_template)
+        # Compiled once; rendering reuses the compiled template on every call
+        self._compiled_template = get_compiled_template(prompt_template)
+    
     def execute(
         self,
         current_query: str,
@@ -54,7 +63,7 @@ class GeneralUsePrompt(BasePromptComponent):
         formatted_context = self._format_retrieved_context(retrieved_context_chunks)
         
         # Fill template placeholders
-        formatted_prompt = self.prompt_template.format(
+        formatted_prompt = self._compiled_template.render(
             chat_history=formatted_chat_history,
             user_query=current_query,
             retrieved_context=formatted_context
@@ -67,19 +76,15 @@ class GeneralUsePrompt(BasePromptComponent):
         if not chat_history:
             return "No prior conversation history."
         
-        formatted_turns = []
-        for turn in chat_history:
-            role = turn.get("role", "unknown")
-            content = turn.get("content", "")
-            formatted_turns.append(f"{role}: {content}")
-        
-        return "\n".join(formatted_turns)
+        return format_chat_history(chat_history)
     
     def _format_retrieved_context(self, context_chunks: List[str]) -> str:
         """Format retrieved context chunks into a string."""
         if not context_chunks:
             return "No relevant context found."
-        
+        if len(context_chunks) == 1:
+            return context_chunks[0]
+
         return "\n---\n".join(context_chunks)
 
 # Registry of prompt providers - similar to retrieval.py pattern
@@ -87,9 +92,20 @@ PROMPT_PROVIDER_REGISTRY: Dict[str, Type[BasePromptComponent]] = {
     "general_use": GeneralUsePrompt
 }
 
+# Formatters are stateless once built, so one instance per (type, template) is shared.
+# Bounded in case templates are user-supplied.
+@lru_cache(maxsize=32)
+def _build_prompt_formatter(prompt_type: str, prompt_template: str) -> BasePromptComponent:
+    formatter_class = PROMPT_PROVIDER_REGISTRY.get(prompt_type)
+    if not formatter_class:
+        raise ValueError(f"Unsupported prompt formatter type: '{prompt_type}'. "
+                         f"Supported types are: {list(PROMPT_PROVIDER_REGISTRY.keys())}")
+    return formatter_class(prompt_template=prompt_template)
+
 def create_prompt_formatter(prompt_type: str, prompt_template: str) -> BasePromptComponent:
     """
     Factory function to create an instance of a prompt formatter.
+    Repeated calls with the same arguments return the same cached instance.
     
     Args:
         prompt_type: The type of prompt formatter to use.
@@ -98,20 +114,16 @@ def create_prompt_formatter(prompt_type: str, prompt_template: str) -> BasePromp
     Returns:
         An instance of the specified prompt formatter
     """
-    formatter_class = PROMPT_PROVIDER_REGISTRY.get(prompt_type)
-    if not formatter_class:
-        raise ValueError(f"Unsupported prompt formatter type: '{prompt_type}'. "
-                         f"Supported types are: {list(PROMPT_PROVIDER_REGISTRY.keys())}")
-    return formatter_class(prompt_template=prompt_template)
+    return _build_prompt_formatter(prompt_type, prompt_template)
 
 # Demo usage
 if __name__ == "__main__":
-    from app.core.config import settings
+    from app.core.config import get_settings
     
     print("--- Simple Prompt Formatter Demonstration ---")
     
     # Get prompt template from config
-    prompt_template = settings.prompt_config.general_system_template
+    prompt_template = get_settings().prompt_config.general_system_template
     
     # Create prompt formatter using the factory function
     prompt_formatter = create_prompt_formatter(
@@ -6,39 +6,62 @@ Responsibilities:
 - Uses a pipeline of components to build system instructions.
 - Formats retrieved context and integrates it with the current query.
 - Produces a list of messages suitable for LLMService.
+
+The simple string formatter lives separately in prompt_engine.py; its
+BasePromptComponent is an unrelated class, so import each from its own module.
 """
 
+import inspect
+import json
+import threading
 from abc import ABC, abstractmethod
-from enum import Enum
-from typing import List, Dict, Any, Optional, Union
-
-from pydantic import BaseModel, Field
-
-
-class PromptBlockContentType(Enum):
-    """Defines the type of content a prompt block represents for rendering."""
-    HEADING = "heading"         
-    PARAGRAPH = "paragraph"    
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import StringIO
+from typing import IO, Callable, ClassVar, List, Dict, Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # Optional; JSON output falls back to the stdlib encoder
+    orjson = None
+
+# Final user message scaffold, filled per request with str.format_map.
+_USER_MSG_TMPL = (
+    "User Query: {q}\n\n"
+    "Retrieved Context:\n---\n{ctx}\n---\n"
+    "Based on the context above, please answer the query."
+)
+_NO_CONTEXT_MSG = "No relevant context was found for this query."
+
+class PromptBlockContentType:
+    """Defines the type of content a prompt block represents for rendering (plain strings)."""
+    HEADING = "heading"
+    PARAGRAPH = "paragraph"
     BULLET_LIST = "bullet_list"
 
-class PromptBlockOutput(BaseModel):
+@dataclass(slots=True)
+class PromptBlockOutput:
     """
     Standardized output from each prompt component, guiding final prompt assembly.
+    Built from internal, already-typed values, so no validation is done here.
     """
     block_id: str
-    content_type: PromptBlockContentType
+    content_type: str
     content: Union[str, List[str]]
     title: Optional[str] = None
 
-    class Config:
-        use_enum_values = True # Store enum values as strings
-
 
 class BasePromptComponent(ABC):
     """
     Abstract base class for all components in the prompt generation pipeline.
     Each component contributes one PromptBlockOutput object.
+
+    Components whose output depends on the per-request inputs (query, context,
+    history or earlier blocks) must set DYNAMIC = True; all others are executed
+    and rendered once when the PromptEngine is built.
     """
+    DYNAMIC: ClassVar[bool] = False
+
     def __init__(self, block_id: str):
         self.block_id = block_id
 
@@ -48,144 +71,154 @@ class BasePromptComponent(ABC):
         current_query: Optional[str] = None,
         retrieved_context: Optional[List[str]] = None,
         chat_history: Optional[List[Dict[str, str]]] = None,
-        existing_system_prompt_parts: Optional[List[PromptBlockOutput]] = None
+        existing_system_prompt_parts: Optional[Tuple[PromptBlockOutput, ...]] = None
     ) -> PromptBlockOutput:
         """
         Generates its part of the prompt.
         Returns a single PromptBlockOutput object.
-        """
-        pass
 
-class BaseBlockRenderer(ABC):
-    """Abstract base class for rendering specific content types of PromptBlockOutput."""
-    @abstractmethod
-    def render(self, content: Union[str, List[str]]) -> str:
-        """Renders the given content to a Markdown string."""
+        existing_system_prompt_parts (an immutable snapshot of the earlier blocks)
+        is only passed when the override names that parameter explicitly.
+        """
         pass
 
-class HeadingBlockRenderer(BaseBlockRenderer):
-    """Renders HEADING content type."""
-    def render(self, content: Union[str, List[str]]) -> str:
-        if isinstance(content, str):
-            return f"### {content}\n" # Render HEADING type content as H3
-        return "" 
+def _render_heading(content: Union[str, List[str]], out: IO[str]) -> None:
+    """Renders HEADING content type (as H3)."""
+    if isinstance(content, str):
+        out.write("### ")
+        out.write(content)
+        out.write("\n")
 
-class ParagraphBlockRenderer(BaseBlockRenderer):
+def _render_paragraph(content: Union[str, List[str]], out: IO[str]) -> None:
     """Renders PARAGRAPH content type."""
-    def render(self, content: Union[str, List[str]]) -> str:
-        if isinstance(content, list):
-            return " ".join(content) + "\n"
-        return str(content) + "\n"
+    if isinstance(content, list):
+        out.write(" ".join(content))
+    else:
+        out.write(str(content))
+    out.write("\n")
 
-class BulletListBlockRenderer(BaseBlockRenderer):
+def _render_bullets(content: Union[str, List[str]], out: IO[str]) -> None:
     """Renders BULLET_LIST content type."""
-    def render(self, content: Union[str, List[str]]) -> str:
-        if isinstance(content, list):
-            items_md = [f"- {item}\n" for item in content]
-            return "".join(items_md)
-        
-        return f"- {str(content)}\n"
-
-class RoleDefinitionComponent(BasePromptComponent):
-    """Defines the LLM's role."""
-    def __init__(self, role_description: str, block_id: str = "role_definition"):
-        super().__init__(block_id)
-        self.role_description = role_description
-
-    def execute(self, **kwargs) -> PromptBlockOutput:
-        return PromptBlockOutput(
-            block_id=self.block_id,
-            title="LLM Role",
-            content_type=PromptBlockContentType.PARAGRAPH,
-            content=self.role_description
-        )
-
-class PrimaryTaskComponent(BasePromptComponent):
-    """Defines the LLM's primary task and objective."""
-    def __init__(self, task_description: str, block_id: str = "primary_task"):
-        super().__init__(block_id)
-        self.task_description = task_description
-
-    def execute(self, **kwargs) -> PromptBlockOutput:
-        return PromptBlockOutput(
-            block_id=self.block_id,
-            title="Primary Task", 
-            content_type=PromptBlockContentType.PARAGRAPH,
-            content=self.task_description
-        )
-
-class ContextUsageRulesComponent(BasePromptComponent):
-    """Defines rules for how the LLM should use retrieved context."""
-    def __init__(self, rules: List[str], block_id: str = "context_rules"):
-        super().__init__(block_id)
-        self.rules = rules
-
-    def execute(self, **kwargs) -> PromptBlockOutput:
-        return PromptBlockOutput(
-            block_id=self.block_id,
-            title="Context Usage Rules", 
-            content_type=PromptBlockContentType.BULLET_LIST,
-            content=self.rules
-        )
-
-class InputStructureExplanationComponent(BasePromptComponent):
-    """Explains the structure of the input the LLM will receive."""
-    def __init__(self, explanations: List[str], block_id: str = "input_structure"):
+    if isinstance(content, list):
+        # One C-level join instead of three writes per item
+        if content:
+            out.write("- ")
+            out.write("\n- ".join(content))
+            out.write("\n")
+        return
+
+    out.write("- ")
+    out.write(str(content))
+    out.write("\n")
+
+# Content type -> renderer writing Markdown to the output buffer.
+_RENDERERS: Dict[str, Callable[[Union[str, List[str]], IO[str]], None]] = {
+    PromptBlockContentType.HEADING: _render_heading,
+    PromptBlockContentType.PARAGRAPH: _render_paragraph,
+    PromptBlockContentType.BULLET_LIST: _render_bullets,
+}
+
+class StaticBlockComponent(BasePromptComponent):
+    """
+    Contributes a fixed block (role, task, rules, ...) that ignores the request inputs.
+    The block is built once and returned as-is on every execute().
+    """
+    def __init__(self, block_id: str, title: Optional[str], content_type: str, content: Union[str, List[str]]):
         super().__init__(block_id)
-        self.explanations = explanations
-
-    def execute(self, **kwargs) -> PromptBlockOutput:
-        return PromptBlockOutput(
-            block_id=self.block_id,
-            title="Input Structure", 
-            content_type=PromptBlockContentType.BULLET_LIST,
-            content=self.explanations
+        self._cached_block = PromptBlockOutput(
+            block_id=block_id,
+            content_type=content_type,
+            content=content,
+            title=title
         )
 
-class BasicOutputGuidanceComponent(BasePromptComponent):
-    """Provides basic guidance on the desired output style."""
-    def __init__(self, guidance_points: List[str], block_id: str = "output_guidance"):
-        super().__init__(block_id)
-        self.guidance_points = guidance_points
-
     def execute(self, **kwargs) -> PromptBlockOutput:
-        return PromptBlockOutput(
-            block_id=self.block_id,
-            title="Output Guidance",
-            content_type=PromptBlockContentType.BULLET_LIST,
-            content=self.guidance_points
-        )
+        return self._cached_block
 
 class PromptEngine:
     """
     Orchestrates prompt generation using a pipeline of components.
     Renders the final prompt into a list of messages for LLMService.
     """
-    def __init__(self, system_prompt_components: List[BasePromptComponent]):
+    # Max number of joined retrieved-context strings kept for reuse.
+    CONTEXT_CACHE_SIZE = 128
+
+    def __init__(self, system_prompt_components: List[BasePromptComponent], message_cache_size: int = 512):
+        """
+        Args:
+            system_prompt_components: Ordered components that build the system message.
+            message_cache_size: Max number of generated message lists kept for repeated
+                                (query, context, history) inputs. 0 disables the cache.
+        """
         self.system_prompt_components = system_prompt_components
-        self.block_renderers: Dict[PromptBlockContentType, BaseBlockRenderer] = {
-            PromptBlockContentType.HEADING: HeadingBlockRenderer(),
-            PromptBlockContentType.PARAGRAPH: ParagraphBlockRenderer(),
-            PromptBlockContentType.BULLET_LIST: BulletListBlockRenderer(),
-        }
+        self.message_cache_size = message_cache_size
+        self._message_cache: "OrderedDict[tuple, List[Dict[str, str]]]" = OrderedDict()
+        self._message_cache_lock = threading.Lock()
+        # Joined context strings for recently seen chunk lists
+        self._ctx_cache: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+        self._ctx_cache_lock = threading.Lock()
+        # Earlier blocks are only passed to components that name the parameter explicitly.
+        self._needs_prev: List[bool] = [
+            self._reads_previous_blocks(component) for component in self.system_prompt_components
+        ]
 
-    def _render_block_to_markdown(self, block: PromptBlockOutput) -> str:
-        """Renders a single PromptBlockOutput to a Markdown string using registered renderers."""
-        md_parts = []
-        
+        # Static components are executed and rendered once; dynamic ones keep a None slot.
+        self._static_renders: List[Optional[Tuple[Optional[PromptBlockOutput], str]]] = []
+        collected_blocks: List[PromptBlockOutput] = []
+        for component, needs_prev in zip(self.system_prompt_components, self._needs_prev):
+            if component.DYNAMIC:
+                self._static_renders.append(None)
+                continue
+            if needs_prev:
+                block_output = component.execute(existing_system_prompt_parts=tuple(collected_blocks))
+            else:
+                block_output = component.execute()
+            if block_output:
+                collected_blocks.append(block_output)
+                self._static_renders.append((block_output, self._render_block_to_markdown(block_output)))
+            else:
+                self._static_renders.append((None, ""))
+
+        # Whole system message, when no component depends on the request.
+        self._cached_system_message: Optional[str] = None
+        self._cached_system_bytes: Optional[bytes] = None
+        if all(render is not None for render in self._static_renders):
+            self._cached_system_message = self._build_system_message()
+            # Encoded once; the system prompt is usually the largest message sent.
+            self._cached_system_bytes = self._cached_system_message.encode("utf-8")
+
+        # Pre-serialized JSON string of the static system prompt, spliced in by orjson.
+        self._cached_system_fragment = None
+        if self._cached_system_message is not None and orjson is not None and hasattr(orjson, "Fragment"):
+            self._cached_system_fragment = orjson.Fragment(orjson.dumps(self._cached_system_message))
+
+    @staticmethod
+    def _reads_previous_blocks(component: BasePromptComponent) -> bool:
+        """Whether the component's execute() declares existing_system_prompt_parts itself."""
+        parameters = inspect.signature(component.execute).parameters
+        return "existing_system_prompt_parts" in parameters
+
+    def _write_block_markdown(self, block: PromptBlockOutput, out: IO[str]) -> None:
+        """Writes a single PromptBlockOutput as Markdown to the buffer using the module renderers."""
         # Render the main title for the block (as H2) if it exists
         if block.title:
-            md_parts.append(f"## {block.title}\n\n")
+            out.write("## ")
+            out.write(block.title)
+            out.write("\n\n")
 
         # Get the specific renderer for the content type
-        renderer = self.block_renderers.get(block.content_type)
+        renderer = _RENDERERS.get(block.content_type)
         if renderer:
-            md_parts.append(renderer.render(block.content))
+            renderer(block.content, out)
         else:
             # Fallback for unknown content type
-            md_parts.append(f"[Unsupported content type: {block.content_type}]\n{str(block.content)}\n")
-        
-        return "".join(md_parts)
+            out.write(f"[Unsupported content type: {block.content_type}]\n{str(block.content)}\n")
+
+    def _render_block_to_markdown(self, block: PromptBlockOutput) -> str:
+        """Renders a single PromptBlockOutput to a Markdown string."""
+        out = StringIO()
+        self._write_block_markdown(block, out)
+        return out.getvalue()
 
     def _build_system_message(
         self,
@@ -194,35 +227,77 @@ class PromptEngine:
         chat_history: Optional[List[Dict[str, str]]] = None
         ) -> str:
         """Builds the complete system message string from components."""
-        system_prompt_str_parts: List[str] = []
+        out = StringIO()
+        separator = ""
 
         # For context to later components
         collected_blocks: List[PromptBlockOutput] = [] 
 
-        for component in self.system_prompt_components:
-            component_args = {
-                "current_query": current_query,
-                "retrieved_context": retrieved_context,
-                "chat_history": chat_history,
-                "existing_system_prompt_parts": collected_blocks.copy()
-            }
+        # Identical for every component in this call
+        component_args = {
+            "current_query": current_query,
+            "retrieved_context": retrieved_context,
+            "chat_history": chat_history,
+        }
+
+        for component, static_render, needs_prev in zip(
+            self.system_prompt_components, self._static_renders, self._needs_prev
+        ):
+            if static_render is not None:
+                block_output, rendered = static_render
+                if block_output:
+                    collected_blocks.append(block_output)
+                    out.write(separator)
+                    out.write(rendered)
+                    separator = "\n"
+                continue
 
             # Execute component and get its PromptBlockOutput
-            block_output = component.execute(**component_args)
+            if needs_prev:
+                block_output = component.execute(
+                    **component_args, existing_system_prompt_parts=tuple(collected_blocks)
+                )
+            else:
+                block_output = component.execute(**component_args)
             if block_output:
                 collected_blocks.append(block_output)
-                system_prompt_str_parts.append(self._render_block_to_markdown(block_output))
-        
-        return "\n".join(system_prompt_str_parts).strip()
+                out.write(separator)
+                self._write_block_markdown(block_output, out)
+                separator = "\n"
+
+        return out.getvalue().strip()
 
 
     def _format_retrieved_context(self, context_chunks: List[str]) -> str:
         """Formats a list of context chunks into a single string for the prompt."""
         if not context_chunks:
-            return "No relevant context was found for this query."
-        
-        return "\n---\n".join(context_chunks)
+            return _NO_CONTEXT_MSG
+        if len(context_chunks) == 1:
+            return context_chunks[0]
+
+        # Chunks handed out by the retriever are the same str objects on repeat
+        # retrievals, so hashing and comparing the key is cheap (cached hashes, identity).
+        cache_key = tuple(context_chunks)
+        with self._ctx_cache_lock:
+            formatted = self._ctx_cache.get(cache_key)
+            if formatted is not None:
+                self._ctx_cache.move_to_end(cache_key)
+                return formatted
+
+        formatted = "\n---\n".join(context_chunks)
+        with self._ctx_cache_lock:
+            self._ctx_cache[cache_key] = formatted
+            if len(self._ctx_cache) > self.CONTEXT_CACHE_SIZE:
+                self._ctx_cache.popitem(last=False)
+        return formatted
     
+    def invalidate(self) -> None:
+        """Drops all cached message lists, e.g. after the document corpus was updated."""
+        with self._message_cache_lock:
+            self._message_cache.clear()
+        with self._ctx_cache_lock:
+            self._ctx_cache.clear()
+
     def generate_prompt_messages(
         self,
         current_query: str,
@@ -231,57 +306,143 @@ class PromptEngine:
     ) -> List[Dict[str, str]]:
         """
         Generates the full list of messages for the LLM.
+        Repeated inputs are served from a bounded LRU cache; each call gets fresh
+        message dicts, so callers may mutate the result.
         """
-        messages: List[Dict[str, str]] = []
-
-        system_content = self._build_system_message(
-            current_query=current_query, 
-            retrieved_context=retrieved_context_chunks, 
-            chat_history=chat_history
+        if self.message_cache_size <= 0:
+            return self._generate_prompt_messages(current_query, retrieved_context_chunks, chat_history)
+
+        # Keyed on the exact inputs (contents, not ids), so a hit always reflects the same evidence.
+        cache_key = (
+            current_query,
+            tuple(retrieved_context_chunks),
+            tuple((turn.get("role"), turn.get("content")) for turn in chat_history) if chat_history else ()
         )
-        if system_content:
-            messages.append({"role": "system", "content": system_content})
+        with self._message_cache_lock:
+            cached = self._message_cache.get(cache_key)
+            if cached is not None:
+                self._message_cache.move_to_end(cache_key)
+        if cached is None:
+            cached = self._generate_prompt_messages(current_query, retrieved_context_chunks, chat_history)
+            with self._message_cache_lock:
+                self._message_cache[cache_key] = [dict(message) for message in cached]
+                if len(self._message_cache) > self.message_cache_size:
+                    self._message_cache.popitem(last=False)
+            return cached
+
+        return [dict(message) for message in cached]
+
+    def generate_prompt_messages_json(
+        self,
+        current_query: str,
+        retrieved_context_chunks: List[str],
+        chat_history: Optional[List[Dict[str, str]]] = None
+    ) -> bytes:
+        """
+        Same as generate_prompt_messages, serialized to a UTF-8 JSON array ready to be
+        used as an HTTP request body. Uses orjson when installed (splicing in the
+        pre-serialized system prompt), otherwise the stdlib json module.
+        """
+        messages = self.generate_prompt_messages(current_query, retrieved_context_chunks, chat_history)
+        if orjson is None:
+            return json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        if self._cached_system_fragment is not None:
+            cached_system = self._cached_system_message
+            for message in messages:
+                if message["content"] is cached_system:
+                    message["content"] = self._cached_system_fragment
+        return orjson.dumps(messages)
+
+    def _generate_prompt_messages(
+        self,
+        current_query: str,
+        retrieved_context_chunks: List[str],
+        chat_history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Dict[str, str]]:
+        """Builds the message list without consulting the cache."""
+        system_content = self._cached_system_message
+        if system_content is None:
+            system_content = self._build_system_message(
+                current_query=current_query,
+                retrieved_context=retrieved_context_chunks,
+                chat_history=chat_history
+            )
 
-        if chat_history:
-            messages.extend(chat_history)
-        
         formatted_context = self._format_retrieved_context(retrieved_context_chunks)
-        user_message_content = (
-            f"User Query: {current_query}\n\n"
-            f"Retrieved Context:\n---\n{formatted_context}\n---\n"
-            "Based on the context above, please answer the query."
-        )
-        messages.append({"role": "user", "content": user_message_content})
+        user_message = {
+            "role": "user",
+            "content": _USER_MSG_TMPL.format_map({"q": current_query, "ctx": formatted_context})
+        }
 
-        return messages
+        # Built in one go instead of growing the list with append/extend
+        if system_content:
+            return [{"role": "system", "content": system_content}, *(chat_history or ()), user_message]
+        return [*(chat_history or ()), user_message]
+
+    def generate_prompt_messages_raw(
+        self,
+        current_query: str,
+        retrieved_context_chunks: List[str],
+        chat_history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Tuple[str, bytes]]:
+        """
+        Same as generate_prompt_messages, but returns (role, UTF-8 content) pairs
+        for transports that send bytes. The cached system prompt is reused as-is,
+        so only the per-request messages are encoded.
+        """
+        cached_system = self._cached_system_message
+        raw_messages: List[Tuple[str, bytes]] = []
+        for message in self.generate_prompt_messages(current_query, retrieved_context_chunks, chat_history):
+            content = message["content"]
+            if content is cached_system:
+                raw_messages.append((message["role"], self._cached_system_bytes))
+            else:
+                raw_messages.append((message["role"], content.encode("utf-8")))
+        return raw_messages
 
 # --- Main execution for demonstration ---
 if __name__ == '__main__':
     print("--- PromptEngine Module Demonstration ---")
 
     # 1. Define concrete components for the system prompt
-    role_comp = RoleDefinitionComponent(
-        role_description="You are a specialized PLC (Programmable Logic Controller) Technical Assistant and expert, with knowledge of documentation and code samples."
+    role_comp = StaticBlockComponent(
+        block_id="role_definition",
+        title="LLM Role",
+        content_type=PromptBlockContentType.PARAGRAPH,
+        content="You are a specialized PLC (Programmable Logic Controller) Technical Assistant and expert, with knowledge of documentation and code samples."
     )
-    task_comp = PrimaryTaskComponent(
-        task_description="Your primary objective is to accurately answer the user's questions regarding PLCs, their documentation, and related code samples. You must base your answers strictly on the information provided in the 'Retrieved Context' section. Do not use any external knowledge or make assumptions beyond this context."
+    task_comp = StaticBlockComponent(
+        block_id="primary_task",
+        title="Primary Task",
+        content_type=PromptBlockContentType.PARAGRAPH,
+        content="Your primary objective is to accurately answer the user's questions regarding PLCs, their documentation, and related code samples. You must base your answers strictly on the information provided in the 'Retrieved Context' section. Do not use any external knowledge or make assumptions beyond this context."
     )
-    context_rules_comp = ContextUsageRulesComponent(
-        rules=[
+    context_rules_comp = StaticBlockComponent(
+        block_id="context_rules",
+        title="Context Usage Rules",
+        content_type=PromptBlockContentType.BULLET_LIST,
+        content=[
             "The 'Retrieved Context' is your sole source of truth for formulating answers.",
             "If the 'Retrieved Context' does not contain sufficient information to answer the 'User Query', you MUST explicitly state that the information is not available in the provided documents. Do not attempt to answer from outside knowledge or invent information.",
             "If the context contains code samples relevant to the query, present them accurately as found, preserving formatting and indentation if possible within a Markdown code block."
         ]
     )
-    input_struct_comp = InputStructureExplanationComponent(
-        explanations=[
+    input_struct_comp = StaticBlockComponent(
+        block_id="input_structure",
+        title="Input Structure",
+        content_type=PromptBlockContentType.BULLET_LIST,
+        content=[
             "Chat History (if provided): Preceding messages in this conversation will appear first, alternating between 'user' and 'assistant' roles.",
             "User Query: The specific question from the user will be clearly labeled in the final user message.",
             "Retrieved Context: Relevant information fetched from documents (including documentation and code samples) will be provided under a 'Retrieved Context:' heading in the final user message."
         ]
     )
-    output_guide_comp = BasicOutputGuidanceComponent(
-        guidance_points=[
+    output_guide_comp = StaticBlockComponent(
+        block_id="output_guidance",
+        title="Output Guidance",
+        content_type=PromptBlockContentType.BULLET_LIST,
+        content=[
             "Provide clear, concise, and professional answers.",
             "If the query involves steps or procedures, present them logically.",
             "When providing code examples from the context, use Markdown code blocks for proper formatting (e.g., ```python\n...your code...\n``` or ```\n...your code...\n``` for generic code). Ensure the code is clearly delineated from explanatory text."
@@ -0,0 +1,251 @@
+"""
+Query Cache Module responsibilities:
+
+1. Result Reuse:
+
+- Keeps recently retrieved documents keyed on (query embedding, top_k, filters).
+- Serves repeated or retried queries without another vector store round-trip.
+
+2. Bounded & Fresh:
+
+- Evicts least recently used entries beyond a maximum size.
+- Expires entries after a TTL so index updates become visible.
+- Offers explicit invalidation for indexing pipelines.
+
+3. Semantic Reuse (`SemanticRewriteCache`):
+
+- Keeps query rewrites keyed on the embedding of the cleaned query.
+- Serves near-duplicate queries whose cosine similarity clears a threshold.
+
+4. Observability:
+
+- Tracks hits, misses, evictions and expirations.
+"""
+
+import hashlib
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+def _embedding_digest(query_embedding: Union[Sequence[float], np.ndarray]) -> bytes:
+    """
+    Hashes the float32 bytes of the embedding. Not memoized: query buffers may be
+    reused and overwritten in place, and one blake2b pass over a vector is cheap.
+    """
+    return hashlib.blake2b(np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16).digest()
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for retrieval results.
+    """
+    def __init__(self, max_size: int = 2000, ttl_seconds: Optional[float] = 300.0):
+        """
+        Args:
+            max_size: Maximum number of cached queries.
+            ttl_seconds: Seconds an entry stays valid; None disables expiry.
+        """
+        if not isinstance(max_size, int) or max_size <= 0:
+            raise ValueError("max_size must be a positive integer.")
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive or None.")
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @staticmethod
+    def make_key(
+        query_embedding: Union[Sequence[float], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None
+    ) -> bytes:
+        """Builds a compact key from the float32 embedding bytes, top_k, the filters and the included columns."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(_embedding_digest(query_embedding))
+        hasher.update(struct.pack("<i", top_k))
+        if filters:
+            hasher.update(json.dumps(filters, sort_keys=True, default=str).encode("utf-8"))
+        if include is not None:
+            # Separator keeps the filter and include parts from running into each other
+            hasher.update(b"\x00" + ",".join(include).encode("utf-8"))
+        return hasher.digest()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Stores a value, evicting the least recently used entries beyond max_size."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drops one entry, or everything when no key is given (e.g. after re-indexing)."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """Returns hit/miss/eviction counters and the current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+class SemanticRewriteCache:
+    """
+    Thread-safe in-process vector cache for query rewrites.
+
+    Embeddings are stored L2-normalized in a preallocated float32 matrix, so a
+    lookup is a single matrix-vector product. Once full, the oldest entry is
+    overwritten (FIFO).
+    """
+    def __init__(self, threshold: float = 0.92, max_size: int = 1000):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a cached rewrite to be reused.
+            max_size: Maximum number of cached queries.
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1].")
+        if not isinstance(max_size, int) or max_size <= 0:
+            raise ValueError("max_size must be a positive integer.")
+
+        self.threshold = threshold
+        self.max_size = max_size
+        self._matrix: Optional[np.ndarray] = None # Allocated on first put, once the dimension is known
+        self._queries: list = [None] * max_size
+        self._values: list = [None] * max_size
+        self._size = 0
+        self._next = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _normalize(query_embedding: Union[Sequence[float], np.ndarray]) -> Optional[np.ndarray]:
+        vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def get(self, query_embedding: Union[Sequence[float], np.ndarray],
+            threshold: Optional[float] = None) -> Optional[Any]:
+        """
+        Returns the value stored for the most similar cached query, or None if
+        nothing reaches the threshold.
+
+        Args:
+            query_embedding: Embedding of the query being looked up.
+            threshold: Optional per-call override of the similarity threshold.
+        """
+        vector = self._normalize(query_embedding)
+        min_score = self.threshold if threshold is None else threshold
+        with self._lock:
+            if vector is None or self._size == 0 or vector.shape[0] != self._matrix.shape[1]:
+                self._misses += 1
+                return None
+
+            scores = self._matrix[:self._size] @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < min_score:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return self._values[best]
+
+    def put(self, query_embedding: Union[Sequence[float], np.ndarray], value: Any,
+            query: Optional[str] = None) -> None:
+        """
+        Stores a value for the given query embedding.
+
+        Args:
+            query_embedding: Embedding of the query.
+            value: Value to cache (e.g. the rewrite or list of rewrites).
+            query: Optional query text, kept for inspection only.
+        """
+        vector = self._normalize(query_embedding)
+        if vector is None:
+            return
+        with self._lock:
+            if self._matrix is None or vector.shape[0] != self._matrix.shape[1]:
+                # First entry, or the embedding model changed: start over
+                self._matrix = np.empty((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._size = 0
+                self._next = 0
+
+            if self._size == self.max_size:
+                self._evictions += 1
+            else:
+                self._size += 1
+            slot = self._next
+            self._matrix[slot] = vector
+            self._queries[slot] = query
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_size
+
+    def invalidate(self) -> None:
+        """Drops every entry (e.g. after changing the rewriter or its prompt)."""
+        with self._lock:
+            self._size = 0
+            self._next = 0
+            self._queries = [None] * self.max_size
+            self._values = [None] * self.max_size
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """Returns hit/miss/eviction counters and the current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
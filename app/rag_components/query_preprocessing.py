@@ -22,15 +22,92 @@ Note: This module focuses *only* on the initial processing of the query string.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, Callable, ClassVar, List, Optional, Dict, Any
+import functools
 import re
 import html
-from llm_service import LLMService
-from bs4 import BeautifulSoup
 
+if TYPE_CHECKING:
+    from llm_service import LLMService
+
+try:
+    import lxml
+    from lxml import etree as lxml_etree
+except ImportError:  # Optional; HTMLCleaner falls back to regex stripping and BeautifulSoup's html.parser
+    lxml = None
+    lxml_etree = None
+
+# Compiled once; the processors run on every query
+_WS_RE = re.compile(r'\s+')
+# A tag starts with a name, '/', '!' or '?' right after '<' and cannot contain another
+# '<', so comparisons such as 'IN1 < IN2 in <b>...' keep their text
+_TAG_PATTERN = r'<[A-Za-z/!?][^<>]*>'
+_TAG_RE = re.compile(_TAG_PATTERN)
+# Maximal runs of whitespace, tags and entities, for the single-pass cleaner
+_MARKUP_OR_WS_RUN_RE = re.compile(r'(?:\s|' + _TAG_PATTERN + r'|&#?\w+;?)+')
+_ENTITY_OR_WS_RUN_RE = re.compile(r'(?:\s|&#?\w+;?)+')
+# Character references as html.unescape matches them, so unknown ones decode identically
+_CHARREF_RE = re.compile(r'&(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+# The entities user queries actually contain, resolved without html.unescape's general parser
+_COMMON_ENTITIES = {
+    '&amp;': '&', '&lt;': '<', '&gt;': '>', '&quot;': '"',
+    '&#39;': "'", '&#x27;': "'", '&nbsp;': '\xa0',
+}
+
+def _replace_charref(match: "re.Match[str]") -> str:
+    entity = match.group(0)
+    replacement = _COMMON_ENTITIES.get(entity)
+    return replacement if replacement is not None else html.unescape(entity)
+
+def _unescape(text: str) -> str:
+    """Same result as html.unescape, with a table lookup for the common entities."""
+    if '&' not in text:
+        return text
+    # One pass, so '&amp;lt;' decodes to '&lt;' and not further
+    return _CHARREF_RE.sub(_replace_charref, text)
+
+# Strict parser: anything that is not well-formed markup is left to the regex
+_MARKUP_PARSER = lxml_etree.XMLParser(recover=False, resolve_entities=False, no_network=True) \
+    if lxml_etree is not None else None
+
+def _markup_text(query: str) -> Optional[str]:
+    """
+    Returns the text of the query if it parses as balanced markup, else None.
+
+    Only then can every '<' be trusted to open a tag; queries such as
+    'IN<PT and Q' or 'a<b and b>c' are comparisons, not HTML, and go through
+    the regex path instead (which leaves an unclosed '<' alone).
+    """
+    if _MARKUP_PARSER is None:
+        return None
+    try:
+        root = lxml_etree.fromstring(f"<div>{query}</div>", _MARKUP_PARSER)
+    except lxml_etree.XMLSyntaxError:
+        return None
+    # itertext() skips comments and processing instructions and resolves character references
+    return ''.join(root.itertext())
+
+def _is_whitespace_normalized(query: str) -> bool:
+    """
+    True if WhitespaceNormalizer would return the query unchanged. isprintable()
+    is False for every whitespace character other than the ASCII space, so the
+    remaining checks only need to cover leading/trailing and doubled spaces.
+    """
+    return query.isprintable() and '  ' not in query and query == query.strip()
+
+@functools.lru_cache(maxsize=None)
+def _beautifulsoup() -> type:
+    """Imports bs4 on first use; only HTMLCleaner's robust mode needs it."""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup
 
 class BaseQueryProcessor(ABC):
     """Abstract base class for a query processing step."""
+    __slots__ = ()
+    # True if the output is already stripped with whitespace runs collapsed,
+    # so a final whitespace pass after this step would change nothing.
+    NORMALIZES_WHITESPACE: ClassVar[bool] = False
+
     @abstractmethod
     def process(self, query: str) -> str:
         """Processes the query string and returns the processed version."""
@@ -40,6 +117,8 @@ class BaseLLMQueryDenoiser(ABC):
     """
     Abstract base class for an LLM-based query denoiser.
     """
+    __slots__ = ()
+
     @abstractmethod
     def denoise(self, query: str, task_specific_llm_params: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -55,42 +134,113 @@ class BaseLLMQueryDenoiser(ABC):
 
 class WhitespaceNormalizer(BaseQueryProcessor):
     """Normalizes whitespace in a query."""
+    __slots__ = ()
+    NORMALIZES_WHITESPACE: ClassVar[bool] = True
+
     def process(self, query: str) -> str:
         if not isinstance(query, str):
             raise TypeError("Query must be a string.")
+        if _is_whitespace_normalized(query):
+            return query
         query = query.strip()
-        query = re.sub(r'\s+', ' ', query)
+        query = _WS_RE.sub(' ', query)
         return query
 
+# Stateless, so one instance serves every preprocess_query call
+_FINAL_NORMALIZER = WhitespaceNormalizer()
+
 class HTMLCleaner(BaseQueryProcessor):
-    """Removes HTML tags and unescapes HTML entities."""
-    def __init__(self, use_robust_parser: bool = False):
-        self.use_robust_parser = use_robust_parser
-        self._beautifulsoup_available = False
+    """
+    Removes HTML tags and unescapes HTML entities.
+
+    Without the robust parser, queries containing '<' that parse as balanced
+    markup are read with lxml (libxml2), which also copes with tags the regex
+    would cut short (e.g. '<a title="x>y">'); everything else, including bare
+    '<'/'>' comparisons, goes through the tag regex.
+    """
+    __slots__ = ('use_robust_parser', 'parser')
+
+    def __init__(self, use_robust_parser: bool = False, parser: str = "lxml"):
+        """
+        Args:
+            use_robust_parser: Parse with BeautifulSoup instead of stripping tags by regex.
+            parser: BeautifulSoup tree builder for the robust mode. "lxml" parses in
+                    native code (libxml2) without html.parser's per-tag Python callbacks;
+                    falls back to "html.parser" if lxml is not installed.
+        """
+        self.use_robust_parser = bool(use_robust_parser)
         if self.use_robust_parser:
-            self.BeautifulSoup = BeautifulSoup
-            self._beautifulsoup_available = True
+            _beautifulsoup() # Fail at construction, not on the first query, if bs4 is missing
+        self.parser = "html.parser" if parser == "lxml" and lxml is None else parser
 
     def process(self, query: str) -> str:
         if not isinstance(query, str):
             raise TypeError("Query must be a string.")
         
+        if '<' not in query and '&' not in query: # No tags or entities to remove
+            return query
+
         processed_query: str
-        if self.use_robust_parser and self._beautifulsoup_available:
-            soup = self.BeautifulSoup(query, "html.parser")
-            processed_query = soup.get_text(separator=' ')
+        if self.use_robust_parser:
+            processed_query = _beautifulsoup()(query, self.parser).get_text(separator=' ')
+        elif '<' in query and (markup_text := _markup_text(query)) is not None:
+            # Entities are already resolved; unescaping again would decode '&amp;lt;' twice
+            return markup_text
         else:
-            processed_query = re.sub(r'<[^>]+>', '', query)
+            processed_query = _TAG_RE.sub('', query)
 
-        processed_query = html.unescape(processed_query)
+        processed_query = _unescape(processed_query)
         return processed_query
 
+class FusedHTMLWhitespaceCleaner(BaseQueryProcessor):
+    """
+    HTMLCleaner (default mode) followed by WhitespaceNormalizer, in one scan of the query.
+    Balanced markup is read with lxml exactly as HTMLCleaner does; otherwise each maximal run of whitespace, tags and entities is rewritten on its own
+    (tags dropped, entities unescaped, whitespace collapsed); the text between
+    runs is copied once instead of through three intermediate strings.
+    """
+    __slots__ = ()
+    NORMALIZES_WHITESPACE: ClassVar[bool] = True
+
+    @staticmethod
+    def _clean_run(match: "re.Match[str]") -> str:
+        run = match.group(0)
+        if run.isspace():
+            return ' '
+        return _WS_RE.sub(' ', _unescape(_TAG_RE.sub('', run)))
+
+    @staticmethod
+    def _clean_entity_run(match: "re.Match[str]") -> str:
+        run = match.group(0)
+        if run.isspace():
+            return ' '
+        return _WS_RE.sub(' ', _unescape(run))
+
+    def process(self, query: str) -> str:
+        if not isinstance(query, str):
+            raise TypeError("Query must be a string.")
+        if '<' not in query and '&' not in query and _is_whitespace_normalized(query):
+            return query
+        if '<' in query:
+            markup_text = _markup_text(query)
+            if markup_text is not None:
+                return _FINAL_NORMALIZER.process(markup_text)
+            if '&' in query:
+                # Dropping a tag can join the halves of an entity ('&amp<b>;'), so the
+                # tags go first, as in HTMLCleaner, and only entities are decoded after
+                query = _TAG_RE.sub('', query)
+                return _ENTITY_OR_WS_RUN_RE.sub(self._clean_entity_run, query).strip()
+        return _MARKUP_OR_WS_RUN_RE.sub(self._clean_run, query).strip()
+
 class LLMQueryDenoiser(BaseLLMQueryDenoiser):
     """
     An LLM-based query denoiser that uses the LLMService.
     """
-    def __init__(self, llm_service: LLMService, 
+    __slots__ = ('llm_service', 'default_prompt_template')
+
+    def __init__(self, llm_service: "LLMService", 
                  default_prompt_template: Optional[str] = None):
+        from llm_service import LLMService # Deferred: loads the LLM client SDK
         if not isinstance(llm_service, LLMService):
             raise TypeError("llm_service must be an instance of LLMService.")
         self.llm_service = llm_service
@@ -107,22 +257,34 @@ class QueryPreprocessingService:
     """
     Service for cleaning and normalizing user queries.
     """
+    __slots__ = ('cache_size', 'llm_denoiser', 'use_llm_denoiser_flag', '_basic_processors',
+                 '_tail_normalizes_whitespace', '_run_pipeline')
+
     def __init__(
         self,
         basic_processors: Optional[List[BaseQueryProcessor]] = None,
         llm_denoiser: Optional[BaseLLMQueryDenoiser] = None,
-        use_llm_denoiser_flag: bool = False
+        use_llm_denoiser_flag: bool = False,
+        cache_size: int = 4096
     ):
+        """
+        Args:
+            basic_processors: Cleaning steps, applied in order. Defaults to the fused
+                              HTML/whitespace cleaner.
+            llm_denoiser: Optional LLM-based denoiser run after the basic steps.
+            use_llm_denoiser_flag: Whether to run the denoiser.
+            cache_size: Number of raw queries whose basic-pipeline output is kept
+                        (LRU), so repeated queries skip the processors; 0 disables.
+                        The denoiser output is never cached.
+        """
+        if not isinstance(cache_size, int) or cache_size < 0:
+            raise ValueError("cache_size must be a non-negative integer.")
+        self.cache_size = cache_size
+
         if basic_processors is None:
-            self.basic_processors: List[BaseQueryProcessor] = [
-                HTMLCleaner(),
-                WhitespaceNormalizer()
-            ]
-        elif all(isinstance(p, BaseQueryProcessor) for p in basic_processors):
-            self.basic_processors = basic_processors
-        else:
-            raise TypeError("All items in basic_processors must " \
-                            "be instances of BaseQueryProcessor.")
+            # Same result as [HTMLCleaner(), WhitespaceNormalizer()], in one pass
+            basic_processors = [FusedHTMLWhitespaceCleaner()]
+        self.basic_processors = basic_processors
 
         if llm_denoiser is not None and not isinstance(llm_denoiser, BaseLLMQueryDenoiser):
             raise TypeError("llm_denoiser must be an instance of BaseLLMQueryDenoiser or None.")
@@ -130,25 +292,65 @@ class QueryPreprocessingService:
         self.llm_denoiser = llm_denoiser
         self.use_llm_denoiser_flag = use_llm_denoiser_flag
 
+    @property
+    def basic_processors(self) -> List[BaseQueryProcessor]:
+        """The basic cleaning steps; assigning a new list recompiles the pipeline."""
+        return self._basic_processors
+
+    @basic_processors.setter
+    def basic_processors(self, basic_processors: List[BaseQueryProcessor]) -> None:
+        """
+        Validates the processors and recompiles the pipeline. Any object with a
+        callable process(query) method is accepted; BaseQueryProcessor subclasses
+        are the usual case, but duck-typed steps skip the ABC instance check.
+        """
+        for p in basic_processors:
+            if not callable(getattr(p, "process", None)):
+                raise TypeError("All items in basic_processors must provide a " \
+                                "process(query) method (e.g. BaseQueryProcessor instances).")
+        self._basic_processors = basic_processors
+        # The final whitespace pass is redundant when the pipeline already ends with one
+        self._tail_normalizes_whitespace = bool(basic_processors) and \
+            getattr(basic_processors[-1], "NORMALIZES_WHITESPACE", False)
+        self._run_pipeline = self._compile_pipeline()
+        if self.cache_size:
+            # Processors are deterministic, so their combined output can be memoized per raw query
+            self._run_pipeline = functools.lru_cache(maxsize=self.cache_size)(self._run_pipeline)
+
+    def _compile_pipeline(self) -> Callable[[str], str]:
+        """
+        Binds each step's process method once and composes them into a single
+        function. Without an LLM denoiser the final whitespace pass is part of it.
+        Call again (or reassign basic_processors) after mutating the list in place.
+        """
+        fns = tuple(p.process for p in self._basic_processors)
+        if not self._tail_normalizes_whitespace:
+            fns += (_FINAL_NORMALIZER.process,)
+
+        if len(fns) == 1:
+            return fns[0]
+
+        def _run(query: str) -> str:
+            for fn in fns:
+                query = fn(query)
+            return query
+        return _run
+
     def preprocess_query(
             self, raw_query: str, 
             task_specific_llm_params: Optional[Dict[str, Any]] = None) -> str:
         if not isinstance(raw_query, str):
             raise TypeError("Raw query must be a string.")
 
-        processed_query = raw_query
-        for processor in self.basic_processors:
-            processed_query = processor.process(processed_query)
+        processed_query = self._run_pipeline(raw_query)
 
         if self.use_llm_denoiser_flag and self.llm_denoiser:
             processed_query = self.llm_denoiser.denoise(
                     processed_query, 
                     task_specific_llm_params=task_specific_llm_params
                 )
-        
-        # Ensure clean whitespace at the very end
-        final_normalizer = WhitespaceNormalizer()
-        processed_query = final_normalizer.process(processed_query)
+            # Ensure clean whitespace at the very end (LLM output always needs it)
+            processed_query = _FINAL_NORMALIZER.process(processed_query)
         
         return processed_query
 
@@ -176,5 +378,19 @@ if __name__ == '__main__':
     clean_query4_robust = preprocessor_robust_html.preprocess_query(raw_query1)
     print(f"Cleaned Query 1 (Robust HTML): '{clean_query4_robust}'")
 
+    # --- Test Case 4: Comparison operators are not markup ---
+    print("\n--- Test Case 4: Bare '<' / '>' in Queries ---")
+    preprocessor_explicit = QueryPreprocessingService(basic_processors=[HTMLCleaner(), WhitespaceNormalizer()])
+    for raw_query, expected in [
+        ("TON timer when IN<PT and Q", "TON timer when IN<PT and Q"),
+        ("is Q set when ET > PT", "is Q set when ET > PT"),
+        ("compare IN1 < IN2 in <b>ladder</b> logic", "compare IN1 < IN2 in ladder logic"),
+        ('<a title="x>y">TON</a> &amp; TOF', "TON & TOF"),
+    ]:
+        fused_result = preprocessor_default.preprocess_query(raw_query)
+        explicit_result = preprocessor_explicit.preprocess_query(raw_query)
+        status = "OK" if fused_result == explicit_result == expected else "MISMATCH"
+        print(f"{status}: '{raw_query}' -> '{fused_result}' (explicit chain: '{explicit_result}')")
+
 
     print("\n--- Query Preprocessing Module Demonstration Finished ---")
\ No newline at end of file
@@ -10,6 +10,7 @@ Query Rewriting Module Responsibilities:
 
 - Provides concrete classes for different rewriting strategies.
 - Each class encapsulates the logic for its specific rewriting strategy.
+- LLM-based rewriters coalesce concurrent calls into batched LLM requests (`RewriteBatcher`).
 
 3. Configuration & Instantiation (`QueryRewriterConfig`, `create_query_rewriter`):
 
@@ -21,18 +22,37 @@ Query Rewriting Module Responsibilities:
 - Manages an instance of a configured query rewriter.
 - Accepts a cleaned query string and optional LLM parameters.
 - Delegates the rewriting task to the active rewriter instance.
+- Optionally serves near-duplicate queries from a semantic cache instead of the rewriter.
 - Outputs either a single rewritten query string or a list of rewritten query strings.
 """
 
+import hashlib
+import json
+import queue
+import re
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Union, Dict, Any, Optional, Type
-from llm_service import LLMService, GeneratedOutput, LLMProviderConfig, create_llm_provider
+from concurrent.futures import Future
+from types import MappingProxyType
+from typing import TYPE_CHECKING, List, Mapping, Union, Dict, Any, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    # Annotation-only: importing llm_service pulls in the LLM client SDK, which
+    # callers using only the passthrough rewriter should not pay for
+    from llm_service import GeneratedOutput, LLMService
+    from embeddings import BaseEmbeddingProvider, EmbeddingService
+    # query_cache imports numpy; it is only loaded when a cache is actually passed
+    from query_cache import SemanticRewriteCache
 
 
 class QueryRewriterConfig:
     """
     Configuration for a query rewriter.
     """
+    __slots__ = ('rewriter_type', 'rewriter_kwargs')
+
     def __init__(self, rewriter_type: str, **kwargs: Any):
         """
         Args:
@@ -43,7 +63,8 @@ class QueryRewriterConfig:
         if not isinstance(rewriter_type, str) or not rewriter_type:
             raise ValueError("rewriter_type must be a non-empty string.")
         
-        self.rewriter_type = rewriter_type.lower()
+        # Interned like the registry keys, so the factory lookup compares by identity
+        self.rewriter_type = sys.intern(rewriter_type.lower())
         self.rewriter_kwargs = kwargs
 
 class BaseQueryRewriter(ABC):
@@ -51,7 +72,9 @@ class BaseQueryRewriter(ABC):
     Abstract base class for all query rewriters.
     Defines the contract for rewriting a cleaned query.
     """
-    def __init__(self, config: QueryRewriterConfig, llm_service: Optional[LLMService] = None):
+    __slots__ = ('config', 'llm_service')
+
+    def __init__(self, config: QueryRewriterConfig, llm_service: Optional["LLMService"] = None):
         """
         Args:
             config: Configuration specific to this rewriter instance.
@@ -79,12 +102,35 @@ class BaseQueryRewriter(ABC):
         if runtime_llm_params is not None and not isinstance(runtime_llm_params, dict):
             raise TypeError("runtime_llm_params must be a dictionary if provided.")
 
+    def rewrite_batch(self, cleaned_queries: List[str],
+                      runtime_llm_params: Optional[Dict[str, Any]] = None) -> List[Union[str, List[str]]]:
+        """
+        Rewrites several cleaned queries (e.g. an evaluation set or an offline corpus).
+
+        The default implementation calls rewrite_query() per query; LLM-based
+        rewriters override it to send the prompts in batched LLM calls.
+
+        Args:
+            cleaned_queries: The query strings after initial preprocessing.
+            runtime_llm_params: Optional runtime parameters shared by all queries.
+        Returns:
+            One rewrite result per query, in input order.
+        """
+        if not isinstance(cleaned_queries, list):
+            raise TypeError("cleaned_queries must be a list of strings.")
+        return [self.rewrite_query(query, runtime_llm_params) for query in cleaned_queries]
+
+    def close(self) -> None:
+        """Releases background resources held by the rewriter (none by default)."""
+
 class PassThroughQueryRewriter(BaseQueryRewriter):
     """
     A simple rewriter that performs no transformation.
     It returns the cleaned query as is.
     """
-    def __init__(self, config: QueryRewriterConfig, llm_service: Optional[LLMService] = None):
+    __slots__ = ()
+
+    def __init__(self, config: QueryRewriterConfig, llm_service: Optional["LLMService"] = None):
         super().__init__(config, llm_service)
         # This rewriter does not use llm_service, but accepts it for interface consistency.
 
@@ -94,48 +140,295 @@ class PassThroughQueryRewriter(BaseQueryRewriter):
         
         return cleaned_query
 
+    def rewrite_batch(self, cleaned_queries: List[str],
+                      runtime_llm_params: Optional[Dict[str, Any]] = None) -> List[Union[str, List[str]]]:
+        if not isinstance(cleaned_queries, list):
+            raise TypeError("cleaned_queries must be a list of strings.")
+        for query in cleaned_queries:
+            super().rewrite_query(query, runtime_llm_params)
+        return list(cleaned_queries)
+
+# Default multi-query prompt. The fixed instructions come first and the query last,
+# so every prompt built from it shares the longest possible literal prefix; keep it
+# a constant so the prefix (and its KV-cache entry on the backend) stays stable.
+DEFAULT_MULTI_QUERY_PROMPT_TEMPLATE = (
+    "Generate {num_queries} diverse alternative phrasings for the query below. "
+    "Return each phrasing on a new line.\nQuery: {query}"
+)
+
+# (template key, prompt, runtime params, future resolved with the GeneratedOutput)
+_RewriteRequest = Tuple[Optional[str], str, Optional[Dict[str, Any]], "Future[GeneratedOutput]"]
+
+class RewriteBatcher:
+    """
+    Collapses concurrent rewrite prompts into batched LLM calls.
+
+    Callers submit a prompt and get a Future. A background thread collects prompts
+    for up to max_wait_ms (or until max_batch are queued), groups them by prompt
+    template and runtime params and issues one LLMService.generate_batch() call per
+    group. Prompts in a group are sent sorted, so those sharing a prefix arrive
+    back to back and the backend's prefix (KV) cache is reused across the batch
+    (vLLM with --enable-prefix-caching, automatic prompt caching on hosted APIs).
+
+    One batcher may be shared by several rewriters using the same LLMService.
+    """
+    def __init__(self, llm_service: "LLMService", max_wait_ms: float = 10.0, max_batch: int = 32):
+        if not isinstance(max_batch, int) or max_batch <= 0:
+            raise ValueError("max_batch must be a positive integer.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be non-negative.")
+
+        self.llm_service = llm_service
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._requests: "queue.Queue[Optional[_RewriteRequest]]" = queue.Queue()
+        # Guards _closed, so nothing is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="rewrite-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str, params: Optional[Dict[str, Any]] = None,
+               template_key: Optional[str] = None) -> "Future[GeneratedOutput]":
+        """
+        Queues a prompt; the returned Future resolves to its GeneratedOutput.
+
+        Args:
+            prompt: The fully formatted prompt.
+            params: Optional runtime parameters for the LLM.
+            template_key: Identifies the template the prompt was built from, so
+                          prompts sharing a prefix are batched together.
+
+        Raises:
+            RuntimeError: If the batcher has been closed.
+        """
+        future: "Future[GeneratedOutput]" = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("RewriteBatcher is closed.")
+            self._requests.put((template_key, prompt, params, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+            pending = [first]
+            deadline = time.monotonic() + self.max_wait_s
+            stop = False
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+
+            self._flush(pending)
+            if stop:
+                return
+
+    def _flush(self, pending: List[_RewriteRequest]) -> None:
+        """Issues one generate_batch() per distinct (template, runtime params) group, prompts sorted."""
+        groups: Dict[Tuple[Optional[str], Optional[str]], List[_RewriteRequest]] = {}
+        for request in pending:
+            params_key = json.dumps(request[2], sort_keys=True, default=str) if request[2] else None
+            groups.setdefault((request[0], params_key), []).append(request)
+
+        for group in groups.values():
+            # Lexicographic order puts prompts with the longest common prefixes next to each other
+            group.sort(key=lambda request: request[1])
+            try:
+                outputs = self.llm_service.generate_batch([request[1] for request in group], group[0][2])
+            except Exception as e:
+                for request in group:
+                    request[3].set_exception(e)
+                continue
+            if len(outputs) != len(group):
+                error = RuntimeError(
+                    f"generate_batch returned {len(outputs)} outputs for {len(group)} prompts.")
+                for request in group:
+                    request[3].set_exception(error)
+                continue
+            for request, output in zip(group, outputs):
+                request[3].set_result(output)
+
+    def close(self) -> None:
+        """
+        Stops the worker after it has served everything queued so far.
+        Later submit() calls raise instead of queueing a prompt nobody serves.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._worker.join()
+
 class LLMMultiQueryRewriter(BaseQueryRewriter):
     """
     An LLM-based rewriter that generates multiple variations of the original query.
-    (Placeholder - Not Implemented Yet)
+
+    Recognised config kwargs:
+        num_queries: Number of alternative phrasings to request (default 3).
+        prompt_template: Template with {num_queries} and {query} placeholders; put
+                         {query} last to maximise the prefix shared across prompts.
+        batching: Coalesce concurrent calls into batched LLM requests (default False).
+                  Starts a worker thread and adds up to batch_wait_ms to each call;
+                  enable it for concurrent callers and close() the rewriter when done.
+        batcher: A RewriteBatcher to share with other rewriters (implies batching).
+        batch_max_size: Maximum prompts per batched LLM request, for both the
+                        batcher and rewrite_batch (default 32; 32-64 is usually
+                        the sweet spot between per-call overhead and latency).
+        batch_wait_ms: How long the batcher waits for more prompts (default 10).
     """
-    def __init__(self, config: QueryRewriterConfig, llm_service: Optional[LLMService] = None):
+    __slots__ = ('num_queries_to_generate', 'prompt_template', '_prompt_parts', '_template_key',
+                 'batcher', '_owns_batcher', 'batch_max_size')
+    # Strips list markers such as "1.", "2)", "-" or "*" the LLM may put in front of a phrasing
+    _LIST_MARKER_RE = re.compile(r'^\s*(?:\d+[.)]|[-*\u2022])\s*')
+
+    def __init__(self, config: QueryRewriterConfig, llm_service: Optional["LLMService"] = None):
         super().__init__(config, llm_service)
         if not self.llm_service:
             raise ValueError("LLMMultiQueryRewriter requires an LLMService instance.")
         
-        # Example: Extract rewriter-specific config
         self.num_queries_to_generate = self.config.rewriter_kwargs.get("num_queries", 3)
-        self.prompt_template = self.config.rewriter_kwargs.get(
-            "prompt_template",
-            "Generate {num_queries} diverse alternative phrasings for the query: '{query}'. "
-            "Return each phrasing on a new line."
+        self.prompt_template: str = self.config.rewriter_kwargs.get(
+            "prompt_template", DEFAULT_MULTI_QUERY_PROMPT_TEMPLATE
         )
-        print(f"LLMMultiQueryRewriter initialized. Will use LLMService. Num queries: {self.num_queries_to_generate}")
-
+        # Format once with a sentinel for the query: num_queries is fixed for the
+        # rewriter's lifetime, so each prompt is just the query joined between
+        # these literal pieces (and every prompt starts with the same interned prefix).
+        sentinel = "\x00query\x00"
+        try:
+            formatted = self.prompt_template.format(num_queries=self.num_queries_to_generate, query=sentinel)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"Invalid prompt_template for LLMMultiQueryRewriter: {e}") from e
+        if sentinel not in formatted:
+            raise ValueError("prompt_template must contain a {query} placeholder.")
+        self._prompt_parts: Tuple[str, ...] = tuple(sys.intern(part) for part in formatted.split(sentinel))
+        # Batcher bucket for this template; the template never changes after init
+        self._template_key = hashlib.blake2b(self.prompt_template.encode("utf-8"), digest_size=8).hexdigest()
+        self.batcher: Optional[RewriteBatcher] = self.config.rewriter_kwargs.get("batcher")
+        self._owns_batcher = False
+        self.batch_max_size: int = self.config.rewriter_kwargs.get("batch_max_size", 32)
+        if not isinstance(self.batch_max_size, int) or self.batch_max_size <= 0:
+            raise ValueError("batch_max_size must be a positive integer.")
+        if self.batcher is not None:
+            if not isinstance(self.batcher, RewriteBatcher):
+                raise TypeError("batcher must be an instance of RewriteBatcher.")
+        elif self.config.rewriter_kwargs.get("batching", False):
+            self._owns_batcher = True
+            self.batcher = RewriteBatcher(
+                self.llm_service,
+                max_wait_ms=self.config.rewriter_kwargs.get("batch_wait_ms", 10.0),
+                max_batch=self.batch_max_size
+            )
+
+    def _parse_rewrites(self, text: str) -> List[str]:
+        """Splits the LLM response into distinct, non-empty phrasings."""
+        rewrites: List[str] = []
+        seen = set()
+        for line in text.splitlines():
+            phrasing = self._LIST_MARKER_RE.sub('', line).strip().strip('"\'')
+            if phrasing and phrasing.lower() not in seen:
+                seen.add(phrasing.lower())
+                rewrites.append(phrasing)
+        return rewrites[:self.num_queries_to_generate]
 
     def rewrite_query(self, cleaned_query: str, runtime_llm_params: Optional[Dict[str, Any]] = None) -> Union[str, List[str]]:
+        """
+        Returns up to num_queries alternative phrasings, or [cleaned_query] if the
+        LLM returned none.
+
+        Raises:
+            RuntimeError: If the LLM call fails.
+        """
         super().rewrite_query(cleaned_query, runtime_llm_params)
-                
-        raise NotImplementedError(
-            "LLMMultiQueryRewriter.rewrite_query() is not fully implemented yet. "
-            "Actual LLM call and response parsing are needed."
-        )
+
+        prompt = cleaned_query.join(self._prompt_parts)
+        if self.batcher is not None:
+            output = self.batcher.submit(prompt, runtime_llm_params, self._template_key).result()
+        else:
+            output = self.llm_service.generate_text(prompt, runtime_llm_params)
+        if output["error"]:
+            raise RuntimeError(f"Query rewriting failed: {output['error']}")
+
+        return self._parse_rewrites(output["text"]) or [cleaned_query]
+
+    def rewrite_batch(self, cleaned_queries: List[str],
+                      runtime_llm_params: Optional[Dict[str, Any]] = None) -> List[Union[str, List[str]]]:
+        """
+        Rewrites the queries with one generate_batch() call per batch_max_size prompts,
+        bypassing the micro-batcher (the batch is already formed).
+
+        Raises:
+            RuntimeError: If the LLM call fails for any of the queries.
+        """
+        if not isinstance(cleaned_queries, list):
+            raise TypeError("cleaned_queries must be a list of strings.")
+        for query in cleaned_queries:
+            BaseQueryRewriter.rewrite_query(self, query, runtime_llm_params)
+
+        prompts = [query.join(self._prompt_parts) for query in cleaned_queries]
+        results: List[Union[str, List[str]]] = []
+        for start in range(0, len(prompts), self.batch_max_size):
+            outputs = self.llm_service.generate_batch(prompts[start:start + self.batch_max_size], runtime_llm_params)
+            for query, output in zip(cleaned_queries[start:start + self.batch_max_size], outputs):
+                if output["error"]:
+                    raise RuntimeError(f"Query rewriting failed for '{query}': {output['error']}")
+                results.append(self._parse_rewrites(output["text"]) or [query])
+        return results
+
+    def close(self) -> None:
+        """Stops the batching worker, if this rewriter created it."""
+        if self.batcher is not None and self._owns_batcher:
+            self.batcher.close()
 
 class QueryRewritingService:
     """
     Service for applying a chosen query rewriting strategy.
     """
-    def __init__(self, rewriter: BaseQueryRewriter):
+    __slots__ = ('rewriter', 'cache', 'embedder', '_inflight', '_inflight_lock', '_coalesce')
+
+    def __init__(
+        self,
+        rewriter: BaseQueryRewriter,
+        cache: Optional["SemanticRewriteCache"] = None,
+        embedder: Optional[Union["BaseEmbeddingProvider", "EmbeddingService"]] = None
+    ):
         """
         Initializes the QueryRewritingService.
 
         Args:
             rewriter: An instance of a class that implements BaseQueryRewriter.
+            cache: Optional semantic cache; rewrites of sufficiently similar
+                   queries are reused instead of calling the rewriter again.
+            embedder: Object with an embed_query(text) method used to key the cache
+                      (an embedding provider or EmbeddingService). Required with cache.
         """
         if not isinstance(rewriter, BaseQueryRewriter):
             raise TypeError("Rewriter must be an instance of BaseQueryRewriter.")
+        if cache is not None:
+            from query_cache import SemanticRewriteCache
+            if not isinstance(cache, SemanticRewriteCache):
+                raise TypeError("cache must be an instance of SemanticRewriteCache.")
+        if cache is not None and not callable(getattr(embedder, "embed_query", None)):
+            raise ValueError("An embedder with an embed_query() method is required when a cache is given.")
         self.rewriter = rewriter
+        self.cache = cache
+        self.embedder = embedder
+        # (cleaned query, params JSON) -> Future of the rewrite currently being computed
+        self._inflight: Dict[Tuple[str, Optional[str]], "Future[Union[str, List[str]]]"] = {}
+        self._inflight_lock = threading.Lock()
+        # Passing the query through is cheaper than coalescing it
+        self._coalesce = not isinstance(rewriter, PassThroughQueryRewriter)
 
     def execute_rewrite(self, cleaned_query: str, 
                         runtime_llm_params: Optional[Dict[str, Any]] = None) -> Union[str, List[str]]:
@@ -146,20 +439,88 @@ class QueryRewritingService:
             cleaned_query: The query string after initial preprocessing.
             runtime_llm_params: Optional runtime parameters for LLM-based rewriters.
 
+        Concurrent calls for the same query and parameters share a single rewrite:
+        the first caller computes it and the others wait for its result.
+
         Returns:
             A single rewritten query string or a list of rewritten query strings.
         """
-        return self.rewriter.rewrite_query(cleaned_query, runtime_llm_params=runtime_llm_params)
+        if not self._coalesce:
+            return self._rewrite(cleaned_query, runtime_llm_params)
+
+        key = (cleaned_query, json.dumps(runtime_llm_params, sort_keys=True, default=str)
+               if runtime_llm_params is not None else None)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            result = future.result()
+            return list(result) if isinstance(result, list) else result
+
+        try:
+            result = self._rewrite(cleaned_query, runtime_llm_params)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # Waiters get their own copies of a list result
+            future.set_result(list(result) if isinstance(result, list) else result)
+            return result
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _rewrite(self, cleaned_query: str,
+                 runtime_llm_params: Optional[Dict[str, Any]]) -> Union[str, List[str]]:
+        """Serves the rewrite from the semantic cache or the rewriter."""
+        # Per-call LLM parameters may change the output, so those calls bypass the cache
+        if self.cache is None or runtime_llm_params is not None:
+            return self.rewriter.rewrite_query(cleaned_query, runtime_llm_params=runtime_llm_params)
+
+        query_embedding = self.embedder.embed_query(cleaned_query)
+        cached = self.cache.get(query_embedding)
+        if cached is not None:
+            return list(cached) if isinstance(cached, list) else cached
+
+        rewritten = self.rewriter.rewrite_query(cleaned_query)
+        self.cache.put(query_embedding, list(rewritten) if isinstance(rewritten, list) else rewritten,
+                       query=cleaned_query)
+        return rewritten
+
+    def execute_rewrite_batch(self, cleaned_queries: List[str],
+                              runtime_llm_params: Optional[Dict[str, Any]] = None) -> List[Union[str, List[str]]]:
+        """
+        Applies the configured rewriting strategy to many queries at once, for bulk
+        workloads such as evaluation sets. Bypasses the semantic cache and coalescing.
+
+        Args:
+            cleaned_queries: The query strings after initial preprocessing.
+            runtime_llm_params: Optional runtime parameters shared by all queries.
+
+        Returns:
+            One rewrite result per query, in input order.
+        """
+        return self.rewriter.rewrite_batch(cleaned_queries, runtime_llm_params=runtime_llm_params)
+
+    def close(self) -> None:
+        """Closes the rewriter, stopping its batching worker if it has one."""
+        self.rewriter.close()
 
 
-QUERY_REWRITER_REGISTRY: Dict[str, Type[BaseQueryRewriter]] = {
-    "passthrough": PassThroughQueryRewriter,
-    "multi_query_llm": LLMMultiQueryRewriter,
-}
+# Read-only view; the set of rewriters is fixed at import time
+QUERY_REWRITER_REGISTRY: Mapping[str, Type[BaseQueryRewriter]] = MappingProxyType({
+    sys.intern("passthrough"): PassThroughQueryRewriter,
+    sys.intern("multi_query_llm"): LLMMultiQueryRewriter,
+})
+_REGISTRY_KEYS = tuple(QUERY_REWRITER_REGISTRY)
 
 def create_query_rewriter(
     config: QueryRewriterConfig,
-    llm_service: Optional[LLMService] = None
+    llm_service: Optional["LLMService"] = None
 ) -> BaseQueryRewriter:
     """
     Factory function to create an instance of a query rewriter.
@@ -175,7 +536,7 @@ def create_query_rewriter(
     if not rewriter_class:
         raise ValueError(
             f"Unsupported query rewriter type: '{config.rewriter_type}'. "
-            f"Supported types are: {list(QUERY_REWRITER_REGISTRY.keys())}"
+            f"Supported types are: {list(_REGISTRY_KEYS)}"
         )
     
     return rewriter_class(config, llm_service=llm_service)
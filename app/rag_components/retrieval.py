@@ -4,7 +4,7 @@ Retrieval module resposibilities:
 1. Abstracted Vector Store Interaction:
 
 - Defines a common interface (`BaseVectorStoreRetriever`) for various vector databases.
-- Supports concrete implementations (e.g., `ChromaDBRetriever`) for specific databases.
+- Supports concrete implementations (e.g., `ChromaDBRetriever`, `FAISSRetriever`) for specific databases.
 
 2. Retrieval Service Facade (`RetrievalService`):
 
@@ -24,27 +24,70 @@ Retrieval module resposibilities:
 5. Resource Management:
 
 - Manages the lifecycle (connection, cleanup) of the underlying vector store retriever.
+
+6. Result Caching:
+
+- Optionally serves repeated queries from an LRU + TTL cache (`QueryCache`).
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, TypedDict
+from collections import abc as collections_abc
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Dict, Any, Literal, Optional, Sequence, Tuple, TypedDict, Union, get_args
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
 import chromadb
+import faiss
 from chromadb.api.types import QueryResult
 
+from app.rag_components.query_cache import QueryCache
+
+# Process-wide ChromaDB clients keyed by path (None = in-memory), so the index
+# files are opened and warmed up once rather than once per retriever.
+_CLIENT_CACHE: Dict[Optional[str], Any] = {}
+_CLIENT_LOCK = threading.Lock()
+
+def _get_chroma_client(path: Optional[str]) -> "chromadb.ClientAPI":
+    """Returns the shared ChromaDB client for the path, creating it on first use."""
+    with _CLIENT_LOCK:
+        client = _CLIENT_CACHE.get(path)
+        if client is None:
+            client = chromadb.PersistentClient(path=path) if path else chromadb.Client()
+            _CLIENT_CACHE[path] = client
+        return client
+
+# Result columns a retrieval can return. Leaving out "documents" skips loading the
+# chunk texts (e.g. for a first pass that only ranks ids and scores).
+IncludeField = Literal["metadatas", "documents", "distances"]
+DEFAULT_INCLUDE: Tuple[IncludeField, ...] = ("metadatas", "documents", "distances")
+
+# Compression of the stored vectors: fp16 / int8 scalar quantization or product quantization.
+Quantization = Literal["none", "fp16", "int8", "pq"]
+
 class VectorStoreConfig:
     """
     Configuration for a vector store provider.
     """
-    def __init__(self, provider_type: str, **kwargs: Any):
+    def __init__(self, provider_type: str, quantization: Quantization = "none", **kwargs: Any):
         """
         Args:
             provider_type: Type of provider (e.g., 'chromadb', 'faiss').
+            quantization: How stored vectors are compressed ('none', 'fp16', 'int8', 'pq').
+                          Each retriever declares which modes it supports.
             **kwargs: Provider-specific arguments (e.g., path, collection_name for chromadb).
         """
         if not isinstance(provider_type, str) or not provider_type:
             raise ValueError("provider_type must be a non-empty string.")
+        if quantization not in get_args(Quantization):
+            raise ValueError(f"quantization must be one of {get_args(Quantization)}, got '{quantization}'.")
         
         self.provider_type = provider_type.lower()
+        self.quantization = quantization
         self.provider_kwargs = kwargs
 
 class RetrievedDoc(TypedDict):
@@ -56,11 +99,112 @@ class RetrievedDoc(TypedDict):
     metadata: Optional[Dict[str, Any]]
     score: float # Lower is typically better for distances, higher for similarity
 
+@dataclass(slots=True, eq=False)
+class RetrievedBatch(collections_abc.Sequence):
+    """
+    Results of one query stored column-wise (ids, scores, documents, metadatas).
+    Behaves as a read-only sequence of RetrievedDoc; the per-document dicts are
+    only built when the caller indexes or iterates, while scores stay a float32
+    array for vectorized filtering or re-ranking. Slicing returns a RetrievedBatch,
+    `+` returns a plain list, and to_list() gives the List[RetrievedDoc] form
+    (e.g. for json.dumps).
+    """
+    ids: List[str]
+    scores: np.ndarray
+    documents: Optional[List[Optional[str]]] = None
+    metadatas: Optional[List[Optional[Dict[str, Any]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[RetrievedDoc, "RetrievedBatch"]:
+        if isinstance(index, slice):
+            return self._gather(np.arange(len(self.ids))[index])
+        return {
+            "id": self.ids[index],
+            "content": self.documents[index] if self.documents else None,
+            "metadata": self.metadatas[index] if self.metadatas else None,
+            "score": float(self.scores[index])
+        }
+
+    def __iter__(self) -> Iterator[RetrievedDoc]:
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    # Written out because the generated __eq__ would compare the score arrays with ==
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RetrievedBatch):
+            return NotImplemented
+        return (self.ids == other.ids and np.array_equal(self.scores, other.scores)
+                and self.documents == other.documents and self.metadatas == other.metadatas)
+
+    __hash__ = None
+
+    def __add__(self, other: Sequence[RetrievedDoc]) -> List[RetrievedDoc]:
+        if not isinstance(other, collections_abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return self.to_list() + list(other)
+
+    def __radd__(self, other: Sequence[RetrievedDoc]) -> List[RetrievedDoc]:
+        if not isinstance(other, collections_abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return list(other) + self.to_list()
+
+    def to_list(self) -> List[RetrievedDoc]:
+        """Returns the results as a plain list of RetrievedDoc dicts."""
+        return list(self)
+
+    def top(self, k: int) -> "RetrievedBatch":
+        """
+        Returns the k best (lowest-distance) results, ordered best first.
+        Uses argpartition, so only the selected k scores are sorted.
+
+        Args:
+            k: Number of results to keep.
+
+        Returns:
+            A new RetrievedBatch holding at most k results.
+        """
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("k must be a positive integer.")
+        count = len(self.ids)
+        if k >= count:
+            order = np.argsort(self.scores, kind="stable")
+        else:
+            selected = np.argpartition(self.scores, k - 1)[:k]
+            order = selected[np.argsort(self.scores[selected], kind="stable")]
+        return self._gather(order)
+
+    def copy(self) -> "RetrievedBatch":
+        """Returns an independent copy: new lists, metadata dicts and score array."""
+        return RetrievedBatch(
+            ids=list(self.ids),
+            scores=self.scores.copy(),
+            documents=list(self.documents) if self.documents is not None else None,
+            metadatas=[dict(m) if m is not None else None for m in self.metadatas]
+            if self.metadatas is not None else None
+        )
+
+    def _gather(self, indices: np.ndarray) -> "RetrievedBatch":
+        """Builds a new batch holding the rows at the given positions."""
+        return RetrievedBatch(
+            ids=[self.ids[i] for i in indices],
+            scores=self.scores[indices],
+            documents=[self.documents[i] for i in indices] if self.documents else None,
+            metadatas=[self.metadatas[i] for i in indices] if self.metadatas else None
+        )
+
 class BaseVectorStoreRetriever(ABC):
     """
     Abstract base class for all vector store retrievers.
     """
+    # Quantization modes the store can honour; others are rejected at construction.
+    SUPPORTED_QUANTIZATION: Tuple[str, ...] = ("none",)
+
     def __init__(self, config: VectorStoreConfig):
+        if config.quantization not in self.SUPPORTED_QUANTIZATION:
+            raise ValueError(f"{type(self).__name__} does not support quantization "
+                             f"'{config.quantization}'. Supported: {self.SUPPORTED_QUANTIZATION}")
         self.config = config
         self._is_connected = False
 
@@ -80,32 +224,105 @@ class BaseVectorStoreRetriever(ABC):
         if not self._is_connected:
             self.connect()
 
+    @staticmethod
+    def _as_float32(embeddings: Any, ndim: int, error_message: str) -> np.ndarray:
+        """
+        Converts embeddings to a contiguous float32 array in one C-level pass,
+        raising TypeError unless they are numeric and of the expected rank.
+        """
+        try:
+            array = np.asarray(embeddings)
+        except ValueError: # Ragged nested lists
+            raise TypeError(error_message) from None
+        if array.dtype.kind not in "fiu" or array.ndim != ndim or array.size == 0:
+            raise TypeError(error_message)
+        return np.ascontiguousarray(array, dtype=np.float32)
+
+    @staticmethod
+    def _validate_include(include: Sequence[IncludeField]) -> Tuple[IncludeField, ...]:
+        """Returns include as a tuple, raising ValueError for unknown result columns."""
+        include = tuple(include)
+        unknown = [field for field in include if field not in get_args(IncludeField)]
+        if unknown:
+            raise ValueError(f"include entries must be among {get_args(IncludeField)}, got {unknown}.")
+        return include
+
+    def _validate_query(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Validates the retrieve() arguments; returns the query as a float32 vector."""
+        self._ensure_connected()
+        query_vector = self._as_float32(
+            query_embedding, 1, "query_embedding must be a non-empty list or 1-D array of floats.")
+
+        if not isinstance(top_k, int) or top_k <= 0:
+            raise ValueError("top_k must be a positive integer.")
+
+        if filters is not None and not isinstance(filters, dict):
+            raise TypeError("filters must be a dictionary if provided.")
+        return query_vector
+
+    def _validate_queries(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Validates the retrieve_batch() arguments; returns the queries as a float32 matrix."""
+        self._ensure_connected()
+        query_matrix = self._as_float32(
+            query_embeddings, 2, "query_embeddings must be a non-empty list or 2-D array of "
+                                 "equal-length float embeddings.")
+
+        if not isinstance(top_k, int) or top_k <= 0:
+            raise ValueError("top_k must be a positive integer.")
+
+        if filters is not None and not isinstance(filters, dict):
+            raise TypeError("filters must be a dictionary if provided.")
+        return query_matrix
+
     @abstractmethod
     def retrieve(
         self,
-        query_embedding: List[float],
+        query_embedding: Union[List[float], np.ndarray],
         top_k: int,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[RetrievedDoc]:
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> RetrievedBatch:
         """
         Retrieves relevant documents from the vector store.
         Args:
-            query_embedding: The embedding of the query.
+            query_embedding: The embedding of the query (list of floats or 1-D array).
             top_k: The number of top documents to retrieve.
             filters: Optional metadata filters. Format depends on the specific provider.
+            include: Result columns to return; omitted columns are None in the result.
         Returns:
-            A list of RetrievedDoc objects.
+            A RetrievedBatch (a sequence of RetrievedDoc objects).
         """
-        self._ensure_connected()
-        if (not isinstance(query_embedding, list) or 
-            not all(isinstance(x, float) for x in query_embedding)):
-            raise TypeError("query_embedding must be a list of floats.")
-        
-        if not isinstance(top_k, int) or top_k <= 0:
-            raise ValueError("top_k must be a positive integer.")
-        
-        if filters is not None and not isinstance(filters, dict):
-            raise TypeError("filters must be a dictionary if provided.")
+        self._validate_query(query_embedding, top_k, filters)
+
+    @abstractmethod
+    def retrieve_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> List[RetrievedBatch]:
+        """
+        Retrieves documents for several query embeddings in one store call.
+        Args:
+            query_embeddings: The query embeddings (list of float lists or 2-D array).
+            top_k: The number of top documents to retrieve per query.
+            filters: Optional metadata filters, applied to every query.
+            include: Result columns to return; omitted columns are None in the result.
+        Returns:
+            One RetrievedBatch per query embedding, in input order.
+        """
+        self._validate_queries(query_embeddings, top_k, filters)
 
     @abstractmethod
     def cleanup(self) -> None:
@@ -115,105 +332,543 @@ class BaseVectorStoreRetriever(ABC):
 class ChromaDBRetriever(BaseVectorStoreRetriever):
     """
     Vector store retriever for ChromaDB.
+    ChromaDB always stores float32 vectors, so only quantization='none' is supported.
+    Use FAISSRetriever for fp16, int8 or product-quantized storage.
+
+    provider_kwargs: path, collection_name, create_if_missing (False), and the HNSW
+    parameters hnsw_m (16), ef_construction (200), ef_search (100) and space ("l2").
+    A missing collection raises unless create_if_missing=True; the HNSW parameters
+    are only applied when the collection is created, an existing one keeps its own.
     """
     def __init__(self, config: VectorStoreConfig):
         super().__init__(config)
 
-        self.path: Optional[str] = self.config.provider_kwargs.get("path")
-        self.collection_name: str = self.config.provider_kwargs.get(
-            "collection_name", "default_collection")
-        
+        kwargs = self.config.provider_kwargs
+        self.path: Optional[str] = kwargs.get("path")
+        self.collection_name: str = kwargs.get("collection_name", "default_collection")
+        self.create_if_missing: bool = kwargs.get("create_if_missing", False)
+        # Same names and defaults as FAISSRetriever; l2 keeps scores as (squared) L2 distances
+        self.collection_metadata: Dict[str, Any] = {
+            "hnsw:space": kwargs.get("space", "l2"),
+            "hnsw:M": kwargs.get("hnsw_m", 16),
+            "hnsw:construction_ef": kwargs.get("ef_construction", 200),
+            "hnsw:search_ef": kwargs.get("ef_search", 100),
+        }
+
         self.client: Optional[chromadb.ClientAPI] = None
         self.collection: Optional[chromadb.api.models.Collection.Collection] = None
+        # Query callables specialised per (top_k, filter keys, include), see _get_query_fn
+        self._specialized: Dict[Tuple[Any, ...], Callable[..., QueryResult]] = {}
 
     def _connect_to_store(self) -> None:
-        """Initializes ChromaDB client and gets/creates the collection."""
-        if self.path:
-            self.client = chromadb.PersistentClient(path=self.path)
+        """
+        Gets the shared ChromaDB client and the collection. A missing collection
+        raises, unless create_if_missing is set, in which case it is created with
+        the HNSW settings.
+        """
+        self.client = _get_chroma_client(self.path)
+        if self.create_if_missing:
+            self.collection = self.client.get_or_create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
         else:
-            self.client = chromadb.Client() # In-memory client
+            self.collection = self.client.get_collection(name=self.collection_name)
+        self._specialized.clear()
 
-        self.collection = self.client.get_collection(name=self.collection_name)
+    def _get_query_fn(self, top_k: int, filters: Optional[Dict[str, Any]],
+                      include: Tuple[IncludeField, ...]) -> Callable[..., QueryResult]:
+        """
+        Returns a query callable specialised for this top_k, filter shape and include.
+        The closure binds collection.query, n_results and the include list once,
+        so repeated queries with the same configuration skip rebuilding them.
+        """
+        key = (top_k, tuple(sorted(filters)) if filters else None, include)
+        query_fn = self._specialized.get(key)
+        if query_fn is None:
+            if not self.collection:
+                raise RuntimeError("ChromaDB collection is not initialized. Call connect() first.")
+            collection_query = self.collection.query
+            include_list = list(include)
+
+            if filters:
+                def query_fn(query_embeddings, where):
+                    return collection_query(query_embeddings=query_embeddings, n_results=top_k,
+                                            where=where, include=include_list)
+            else:
+                def query_fn(query_embeddings, where=None):
+                    return collection_query(query_embeddings=query_embeddings, n_results=top_k,
+                                            include=include_list)
+            self._specialized[key] = query_fn
+        return query_fn
 
 
     def retrieve(
         self,
-        query_embedding: List[float],
+        query_embedding: Union[List[float], np.ndarray],
         top_k: int,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[RetrievedDoc]:
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> RetrievedBatch:
         
-        super().retrieve(query_embedding, top_k, filters)
-        
-        if not self.collection:
-            raise RuntimeError("ChromaDB collection is not initialized. Call connect() first.")
-
-        query_results: QueryResult = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=filters, 
-            include=['metadatas', 'documents', 'distances']
-        )
+        query_vector = self._validate_query(query_embedding, top_k, filters)
+        query_fn = self._get_query_fn(top_k, filters, self._validate_include(include))
+
+        # chromadb 0.4 validates embeddings as Python lists; tolist() converts in C
+        query_results: QueryResult = query_fn([query_vector.tolist()], filters)
 
-        retrieved_docs: List[RetrievedDoc] = []
-        # ChromaDB returns lists of lists for batched queries
         # We are sending one query_embedding, so we expect results at index 0.
-        ids_list = query_results.get('ids', [[]])[0]
-        docs_list = query_results.get('documents', [[]])[0]
-        metadatas_list = query_results.get('metadatas', [[]])[0]
-        distances_list = query_results.get('distances', [[]])[0] 
-
-        for i in range(len(ids_list)):
-            retrieved_docs.append({
-                "id": ids_list[i],
-                "content": docs_list[i] if docs_list else None,
-                "metadata": metadatas_list[i] if metadatas_list else None,
-                "score": distances_list[i] if distances_list else float('inf')
-            })
-        return retrieved_docs
+        return self._to_retrieved_batch(query_results, 0)
+
+    def retrieve_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> List[RetrievedBatch]:
+
+        query_matrix = self._validate_queries(query_embeddings, top_k, filters)
+        query_fn = self._get_query_fn(top_k, filters, self._validate_include(include))
+
+        # One round-trip for all queries
+        query_results: QueryResult = query_fn(query_matrix.tolist(), filters)
+        return [self._to_retrieved_batch(query_results, i) for i in range(len(query_embeddings))]
+
+    @staticmethod
+    def _to_retrieved_batch(query_results: QueryResult, query_index: int) -> RetrievedBatch:
+        """Wraps the result columns of the query at query_index without per-document copies."""
+        # ChromaDB returns lists of lists for batched queries, one inner list per query.
+        def column(name: str) -> Optional[List[Any]]:
+            values = query_results.get(name)
+            return values[query_index] if values else None
+
+        ids_list = column('ids') or []
+        distances_list = column('distances')
+        if distances_list:
+            scores = np.asarray(distances_list, dtype=np.float32)
+        else:
+            scores = np.full(len(ids_list), np.inf, dtype=np.float32)
+
+        return RetrievedBatch(
+            ids=ids_list,
+            scores=scores,
+            documents=column('documents'),
+            metadatas=column('metadatas')
+        )
 
     def cleanup(self) -> None:
         """
-        ChromaDB client might not have an explicit close. Resetting references.
-        TODO: test this within the RAG pipeline (to be modified accordingly).
+        Drops the collection handle only. The client stays registered process-wide,
+        so reconnecting (or another retriever on the same path) skips the index warm-up.
         """
         self.collection = None
-        self.client = None # Allow garbage collection if persistent client is not shared
+        self._specialized.clear()
+        self._is_connected = False
+
+
+class FAISSRetriever(BaseVectorStoreRetriever):
+    """
+    Vector store retriever backed by a local FAISS HNSW index (flat, scalar-quantized
+    or product-quantized storage, per the config's quantization).
+
+    The index file holds the vectors; a JSON docstore next to it holds the ids,
+    documents and metadatas, aligned with the FAISS row labels. Scores are
+    squared L2 distances (lower is better), as with ChromaDB's default space.
+    """
+    SUPPORTED_QUANTIZATION: Tuple[str, ...] = ("none", "fp16", "int8", "pq")
+
+    def __init__(self, config: VectorStoreConfig):
+        super().__init__(config)
+
+        kwargs = self.config.provider_kwargs
+        self.index_path: Optional[str] = kwargs.get("index_path")
+        self.docstore_path: Optional[str] = kwargs.get(
+            "docstore_path", f"{self.index_path}.docstore.json" if self.index_path else None)
+        self.dimension: Optional[int] = kwargs.get("dimension")
+        # HNSW tuning: graph degree, build-time and query-time candidate list sizes
+        self.hnsw_m: int = kwargs.get("hnsw_m", 16)
+        self.ef_construction: int = kwargs.get("ef_construction", 200)
+        self.ef_search: int = kwargs.get("ef_search", 100)
+        # Product quantization: sub-vectors per embedding (must divide the dimension)
+        self.pq_m: int = kwargs.get("pq_m", 8)
+
+        self.index: Optional[faiss.Index] = None
+        self.ids: List[str] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+
+    def _connect_to_store(self) -> None:
+        """Loads the index and docstore from disk, or creates an empty index."""
+        if self.index_path and os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.docstore_path, "r", encoding="utf-8") as f:
+                docstore = json.load(f)
+            self.ids = docstore["ids"]
+            self.documents = docstore["documents"]
+            self.metadatas = docstore["metadatas"]
+        elif self.dimension:
+            self.index = self._build_index(self.dimension)
+        else:
+            raise RuntimeError("FAISS index not found; provide an existing index_path "
+                               "or a dimension to create an empty index.")
+
+        self.index.hnsw.efSearch = self.ef_search
+
+    def _build_index(self, dimension: int) -> "faiss.Index":
+        """Creates an empty index matching the configured quantization."""
+        quantization = self.config.quantization
+        if quantization == "pq":
+            if dimension % self.pq_m:
+                raise ValueError(f"pq_m ({self.pq_m}) must divide the embedding dimension ({dimension}).")
+            index = faiss.IndexHNSWPQ(dimension, self.pq_m, self.hnsw_m)
+        elif quantization in ("fp16", "int8"):
+            qtype = faiss.ScalarQuantizer.QT_fp16 if quantization == "fp16" else faiss.ScalarQuantizer.QT_8bit
+            index = faiss.IndexHNSWSQ(dimension, qtype, self.hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, self.hnsw_m)
+
+        index.hnsw.efConstruction = self.ef_construction
+        return index
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: Union[List[List[float]], np.ndarray],
+        documents: Optional[List[Optional[str]]] = None,
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> None:
+        """
+        Adds vectors and their documents. Quantized indexes are trained on the
+        first batch added, so it should be representative (and, for 'pq', hold
+        at least 256 vectors).
+        """
+        self._ensure_connected()
+        vectors = self._as_float32(embeddings, 2, "embeddings must be a 2-D list or array of floats.")
+        if len(ids) != len(vectors):
+            raise ValueError("ids and embeddings must have the same length.")
+
+        if not self.index.is_trained:
+            self.index.train(vectors)
+        self.index.add(vectors)
+        self.ids.extend(ids)
+        self.documents.extend(documents if documents is not None else [None] * len(ids))
+        self.metadatas.extend(metadatas if metadatas is not None else [None] * len(ids))
+
+    def save(self) -> None:
+        """Writes the index and its docstore to index_path / docstore_path."""
+        self._ensure_connected()
+        if not self.index_path:
+            raise ValueError("index_path must be configured to save the FAISS index.")
+        faiss.write_index(self.index, self.index_path)
+        with open(self.docstore_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, f)
+
+    def _search_params(self, filters: Optional[Dict[str, Any]]) -> Optional["faiss.SearchParameters"]:
+        """Restricts the search to rows whose metadata equals every filter value."""
+        if not filters:
+            return None
+        if any(key.startswith("$") for key in filters):
+            raise ValueError("FAISSRetriever supports only equality filters ({'field': value}).")
+
+        allowed = np.fromiter(
+            (label for label, metadata in enumerate(self.metadatas)
+             if metadata and all(metadata.get(key) == value for key, value in filters.items())),
+            dtype=np.int64
+        )
+        selector = faiss.IDSelectorBatch(allowed)
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        # The selector only references the label buffer; keep it alive with the params
+        params._allowed_labels = allowed
+        return params
+
+    def _search(self, query_matrix: np.ndarray, top_k: int, filters: Optional[Dict[str, Any]],
+                include: Tuple[IncludeField, ...]) -> List[RetrievedBatch]:
+        if self.index is None:
+            raise RuntimeError("FAISS index is not initialized. Call connect() first.")
+
+        params = self._search_params(filters)
+        if params is None:
+            distances, labels = self.index.search(query_matrix, top_k)
+        else:
+            distances, labels = self.index.search(query_matrix, top_k, params=params)
+
+        # Distances come with every FAISS search, so scores are returned regardless of include
+        with_documents = "documents" in include
+        with_metadatas = "metadatas" in include
+        batches: List[RetrievedBatch] = []
+        for row_distances, row_labels in zip(distances, labels):
+            found = row_labels >= 0 # FAISS pads missing results with -1
+            row_labels = row_labels[found]
+            batches.append(RetrievedBatch(
+                ids=[self.ids[label] for label in row_labels],
+                scores=row_distances[found],
+                documents=[self.documents[label] for label in row_labels] if with_documents else None,
+                metadatas=[self.metadatas[label] for label in row_labels] if with_metadatas else None
+            ))
+        return batches
+
+    def retrieve(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> RetrievedBatch:
+
+        query_vector = self._validate_query(query_embedding, top_k, filters)
+        return self._search(query_vector[None, :], top_k, filters, self._validate_include(include))[0]
+
+    def retrieve_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> List[RetrievedBatch]:
+
+        query_matrix = self._validate_queries(query_embeddings, top_k, filters)
+        return self._search(query_matrix, top_k, filters, self._validate_include(include))
+
+    def cleanup(self) -> None:
+        """Releases the in-memory index and docstore."""
+        self.index = None
+        self.ids, self.documents, self.metadatas = [], [], []
         self._is_connected = False
 
 
+# (query_embedding, top_k, filters, include, future) as queued by RetrievalBatcher.submit
+_BatchRequest = Tuple[np.ndarray, int, Optional[Dict[str, Any]], Tuple[str, ...], Future]
+
+class RetrievalBatcher:
+    """
+    Collapses concurrent single-query retrievals into batched store calls.
+
+    Callers submit a query and get a Future. A background thread collects requests
+    for up to max_wait_ms (or until max_batch are queued), groups them by identical
+    (top_k, filters, include, embedding dimension) and issues one retrieve_batch()
+    call per group. Each request is validated on submit, and a failing group is
+    retried request by request, so one bad query only fails its own Future.
+    """
+    def __init__(self, retriever: BaseVectorStoreRetriever, max_wait_ms: float = 10.0, max_batch: int = 32):
+        if not isinstance(max_batch, int) or max_batch <= 0:
+            raise ValueError("max_batch must be a positive integer.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be non-negative.")
+
+        self.retriever = retriever
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._requests: "queue.Queue[Optional[_BatchRequest]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> "Future[RetrievedBatch]":
+        """Queues a retrieval; the returned Future resolves to its RetrievedBatch."""
+        future: "Future[RetrievedBatch]" = Future()
+        try:
+            query_vector = self.retriever._validate_query(query_embedding, top_k, filters)
+            include = self.retriever._validate_include(include)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        self._requests.put((query_vector, top_k, filters, include, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+            pending = [first]
+            deadline = time.monotonic() + self.max_wait_s
+            stop = False
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+
+            self._flush(pending)
+            if stop:
+                return
+
+    def _flush(self, pending: List["_BatchRequest"]) -> None:
+        """Issues one retrieve_batch() per distinct (top_k, filters, include, dimension) group."""
+        groups: Dict[Tuple[int, Optional[str], Tuple[str, ...], int], List[_BatchRequest]] = {}
+        for request in pending:
+            query_vector, top_k, filters, include, _ = request
+            filters_key = json.dumps(filters, sort_keys=True, default=str) if filters else None
+            # A query of the wrong dimension gets its own group instead of failing the others
+            groups.setdefault((top_k, filters_key, include, len(query_vector)), []).append(request)
+
+        for group in groups.values():
+            _, top_k, filters, include, _ = group[0]
+            try:
+                results = self.retriever.retrieve_batch(np.stack([request[0] for request in group]),
+                                                        top_k, filters, include)
+            except Exception as e:
+                if len(group) == 1:
+                    group[0][4].set_exception(e)
+                    continue
+                # Retry one by one so the error reaches only the request(s) causing it
+                results = None
+            if results is not None and len(results) == len(group):
+                for request, docs in zip(group, results):
+                    request[4].set_result(docs)
+                continue
+            for request in group:
+                try:
+                    request[4].set_result(self.retriever.retrieve(*request[:4]))
+                except Exception as e:
+                    request[4].set_exception(e)
+
+    def close(self) -> None:
+        """Stops the worker after it has served everything queued so far."""
+        if self._worker.is_alive():
+            self._requests.put(None)
+            self._worker.join()
+
+
 class RetrievalService:
     """
     Facade for using vector store retrievers.
     """
-    def __init__(self, retriever: BaseVectorStoreRetriever):
+    # Opt-in: nothing invalidates the cache when documents are added, so a new
+    # document can stay invisible for up to ttl_seconds while it is enabled.
+    DEFAULT_CACHE_CONFIG: Dict[str, Any] = {"enabled": False, "max_size": 2000, "ttl_seconds": 300}
+
+    def __init__(self, retriever: BaseVectorStoreRetriever, cache_config: Optional[Dict[str, Any]] = None,
+                 coalesce: bool = False, coalesce_wait_ms: float = 10.0, coalesce_max_batch: int = 32,
+                 keep_alive: bool = True):
+        """
+        Args:
+            retriever: The vector store retriever to delegate to.
+            cache_config: Query result cache settings ("enabled", "max_size", "ttl_seconds").
+                          Missing keys fall back to DEFAULT_CACHE_CONFIG (disabled). When
+                          enabling it, call invalidate_cache() after indexing new documents.
+            coalesce: Group concurrent retrieve_documents() calls (from several threads)
+                      into batched store queries. Adds up to coalesce_wait_ms latency.
+            coalesce_wait_ms: How long to collect requests before issuing a batch.
+            coalesce_max_batch: Issue a batch early once this many requests are queued.
+            keep_alive: Keep the retriever connected when a `with` block exits, so one
+                        service can be shared across requests; call close() at shutdown.
+                        If False, every `with` block connects and cleans up.
+        """
         if not isinstance(retriever, BaseVectorStoreRetriever):
             raise TypeError("Retriever must be an instance of BaseVectorStoreRetriever.")
+        if cache_config is not None and not isinstance(cache_config, dict):
+            raise TypeError("cache_config must be a dictionary if provided.")
         self.retriever = retriever
+        self.keep_alive = keep_alive
+
+        self._batcher: Optional[RetrievalBatcher] = None
+        if coalesce:
+            self._batcher = RetrievalBatcher(retriever, coalesce_wait_ms, coalesce_max_batch)
+
+        cache_settings = {**self.DEFAULT_CACHE_CONFIG, **(cache_config or {})}
+        self.query_cache: Optional[QueryCache] = None
+        if cache_settings["enabled"]:
+            self.query_cache = QueryCache(
+                max_size=cache_settings["max_size"],
+                ttl_seconds=cache_settings["ttl_seconds"]
+            )
 
     def retrieve_documents(
         self,
-        query_embedding: List[float],
+        query_embedding: Union[List[float], np.ndarray],
         top_k: int,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[RetrievedDoc]:
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> RetrievedBatch:
         """
         Retrieves documents using the configured retriever.
+        If the query cache is enabled, identical (embedding, top_k, filters, include)
+        requests are served from it; every caller gets its own copy of the results.
+        Pass include without "documents" for an ids/scores-only pass; fetch the texts
+        of the few winning ids afterwards.
+
+        Returns a RetrievedBatch rather than the former List[RetrievedDoc]. It indexes,
+        iterates and slices like a sequence of RetrievedDoc; call to_list() where a
+        real list is needed (e.g. json.dumps).
         """
-        return self.retriever.retrieve(query_embedding, top_k, filters)
+        if self.query_cache is None:
+            return self._retrieve_uncached(query_embedding, top_k, filters, include)
+
+        cache_key = QueryCache.make_key(query_embedding, top_k, filters, include)
+        cached_docs = self.query_cache.get(cache_key)
+        if cached_docs is None:
+            cached_docs = self._retrieve_uncached(query_embedding, top_k, filters, include)
+            self.query_cache.put(cache_key, cached_docs)
+        return cached_docs.copy()
+
+    def _retrieve_uncached(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> RetrievedBatch:
+        if self._batcher is None:
+            return self.retriever.retrieve(query_embedding, top_k, filters, include)
+        return self._batcher.submit(query_embedding, top_k, filters, include).result()
+
+    def retrieve_documents_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include: Sequence[IncludeField] = DEFAULT_INCLUDE
+    ) -> List[RetrievedBatch]:
+        """
+        Retrieves documents for several query embeddings with a single store call.
+        """
+        return self.retriever.retrieve_batch(query_embeddings, top_k, filters, include)
+
+    def invalidate_cache(self) -> None:
+        """Drops all cached results, e.g. after documents were added to the store."""
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Returns the query cache counters (empty if caching is disabled)."""
+        if self.query_cache is None:
+            return {}
+        return self.query_cache.get_stats()
+
+    def close(self) -> None:
+        """Stops the request batcher and cleans up the retriever (e.g. at process shutdown)."""
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+        self.retriever.cleanup()
 
     def __enter__(self) -> 'RetrievalService':
-        """Context manager entry: connects the retriever."""
+        """Context manager entry: connects the retriever (a no-op if already connected)."""
         self.retriever.connect()
         return self
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        """Context manager exit: cleans up the retriever."""
-        self.retriever.cleanup()
+        """Context manager exit: closes the service unless keep_alive is set."""
+        if not self.keep_alive:
+            self.close()
 
 PROVIDER_REGISTRY: Dict[str, type[BaseVectorStoreRetriever]] = {
-    "chromadb": ChromaDBRetriever
-    # Future providers like "faiss": FAISSRetriever can be added here
+    "chromadb": ChromaDBRetriever,
+    "faiss": FAISSRetriever
 }
 
 def create_retriever(config: VectorStoreConfig) -> BaseVectorStoreRetriever:
@@ -256,7 +911,7 @@ if __name__ == '__main__':
     retriever_instance = create_retriever(chroma_config)
 
     try:
-        with RetrievalService(retriever_instance) as service: 
+        with RetrievalService(retriever_instance, keep_alive=False) as service: 
            
             print(f"Populating ChromaDB collection '{service.retriever.collection_name}' for test...")
             try:
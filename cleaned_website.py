@@ -1,87 +1,198 @@
+import argparse
+import mmap
 import os
-import json
 import re
-import hashlib
+import threading
 import difflib
 from collections import defaultdict
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import lxml.html
+import orjson
+import xxhash
+from datasketch import MinHash, MinHashLSH
+from lxml import etree
 from tqdm import tqdm
 
+_TYPO3_BEGIN = b"<!--TYPO3SEARCH_begin-->"
+_TYPO3_END = b"<!--TYPO3SEARCH_end-->"
+_TYPO3_SEARCH_ANY_CASE = re.compile(rb'<!--TYPO3SEARCH_begin-->(.*?)<!--TYPO3SEARCH_end-->', re.DOTALL | re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+# Finds the book reference sentence at the end of a page's content
+_BOOK_INFO_RE = re.compile(
+    r"\s*(Speicherprogrammierbare Steuerungen.*?)\s+"
+    r"(\d+\.\s*Auflage)\s+"
+    r"erschienen im\s+(.*?)\s*,?\s*"
+    r"(\d{4})\s*$"
+)
+
+# Pages are UTF-8; decoding is left to libxml2 (one parser per worker process).
+# Whitespace-only text nodes and processing instructions are never part of the
+# extracted text (get_element_text skips blank strings), so they are not built at all.
+# Comments must stay: the TYPO3SEARCH markers are comments.
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8", remove_blank_text=True, remove_pis=True)
+
+# XPath expressions compiled once and reused for every file
+_TITLE_XPATH = etree.XPath('//title')
+_CANONICAL_XPATH = etree.XPath('//link[@rel="canonical"]/@href')
+# ElementPath for iterfind(), which yields lazily so the scan stops at the first match
+_LD_JSON_PATH = './/script[@type="application/ld+json"]'
+_TYPO3_BEGIN_XPATH = etree.XPath('//comment()[contains(., "TYPO3SEARCH_begin")]')
+_MAIN_CONTENT_XPATH = etree.XPath(
+    '//main[contains(concat(" ", normalize-space(@class), " "), " c-page__content ")]'
+)
+
+def get_element_text(element):
+    """
+    Returns the element's text nodes, each stripped, joined by single spaces
+    (the equivalent of BeautifulSoup's get_text(separator=' ', strip=True)).
+    Comment text is skipped.
+    """
+    return " ".join(text.strip() for text in element.itertext() if text.strip())
+
+def extract_typo3_search_content(tree, html_bytes):
+    """
+    Returns an element holding the content between the TYPO3SEARCH_begin and
+    TYPO3SEARCH_end comments, or None if the markers are missing.
+    html_bytes is the raw page as bytes.
+    """
+    begin_comments = _TYPO3_BEGIN_XPATH(tree)
+    if begin_comments:
+        begin = begin_comments[0]
+        # Common case: both markers are siblings, so collect the siblings in between
+        between = []
+        node = begin.getnext()
+        while node is not None and not (not isinstance(node.tag, str) and "TYPO3SEARCH_end" in (node.text or "")):
+            between.append(node)
+            node = node.getnext()
+        if node is not None:
+            container = lxml.html.Element("div")
+            container.text = begin.tail
+            for sibling in between:
+                container.append(sibling) # Moves the node (with its tail) into the container
+            return container
+
+    # Markers at different nesting levels: parse the raw slice between them.
+    # Literal find (memchr/two-way search) instead of a backtracking regex.
+    begin_index = html_bytes.find(_TYPO3_BEGIN)
+    end_index = html_bytes.find(_TYPO3_END, begin_index + len(_TYPO3_BEGIN)) if begin_index >= 0 else -1
+    if end_index >= 0:
+        content_html = html_bytes[begin_index + len(_TYPO3_BEGIN):end_index]
+    else:
+        # Rare: markers written in another case
+        match = _TYPO3_SEARCH_ANY_CASE.search(html_bytes)
+        if not match:
+            return None
+        content_html = match.group(1)
+    return lxml.html.fragment_fromstring(content_html, create_parent="div", parser=_HTML_PARSER)
+
+def parse_typo3_page_parts(html_bytes):
+    """
+    Fast path for pages with TYPO3SEARCH markers: parses only the <head> (title,
+    canonical link, ld+json) and the marked content slice, not the whole page.
+    Returns (head_tree, content_element), or None when the page needs a full parse:
+    markers or </head> missing, markers inside the head, or ld+json outside the head.
+    """
+    begin_index = html_bytes.find(_TYPO3_BEGIN)
+    if begin_index < 0:
+        return None
+    content_start = begin_index + len(_TYPO3_BEGIN)
+    end_index = html_bytes.find(_TYPO3_END, content_start)
+    head_end = html_bytes.find(b"</head>")
+    if end_index < 0 or head_end < 0 or head_end > begin_index:
+        return None
+    if html_bytes.find(b"application/ld+json", head_end) >= 0:
+        return None
+
+    head_tree = lxml.html.document_fromstring(html_bytes[:head_end], parser=_HTML_PARSER)
+    content_element = lxml.html.fragment_fromstring(
+        html_bytes[content_start:end_index], create_parent="div", parser=_HTML_PARSER)
+    return head_tree, content_element
+
 def extract_content_from_html(html_filepath_abs, project_root_dir):
     """
     Extracts title, cleaned text content, and source link from an HTML file.
     """
     try:
-        with open(html_filepath_abs, 'r', encoding='utf-8') as f:
-            html_string = f.read()
-
-        soup = BeautifulSoup(html_string, 'html.parser')
+        # Memory-map the file: the marker search scans the mapping directly and the
+        # fast path copies out only the head and content slices
+        with open(html_filepath_abs, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as html_bytes:
+            page_parts = parse_typo3_page_parts(html_bytes)
+            if page_parts is not None:
+                tree, typo3_search_content = page_parts
+            else:
+                # lxml only parses str/bytes, not an mmap, so the full parse needs a copy
+                page_bytes = html_bytes[:]
+                # Single C-level parse of the whole page; everything below is XPath over this tree
+                tree = lxml.html.document_fromstring(page_bytes, parser=_HTML_PARSER)
+                typo3_search_content = extract_typo3_search_content(tree, page_bytes)
 
         # Extract title
-        page_title = soup.title.string.strip() if soup.title and soup.title.string else "No title found"
+        title_tags = _TITLE_XPATH(tree)
+        page_title = title_tags[0].text.strip() if title_tags and title_tags[0].text else "No title found"
 
         # Extract Canonical URL
-        canonical_url_tag = soup.find('link', rel='canonical')
-        canonical_url = canonical_url_tag['href'].strip() if canonical_url_tag and canonical_url_tag.has_attr('href') else ""
+        canonical_hrefs = _CANONICAL_XPATH(tree)
+        canonical_url = canonical_hrefs[0].strip() if canonical_hrefs else ""
 
         # Extract Breadcrumbs from JSON-LD
         breadcrumbs_list = []
-        script_ld_json = soup.find('script', type='application/ld+json')
-        if script_ld_json and script_ld_json.string:
+        # Pages may carry several ld+json blocks; stop at the first BreadcrumbList
+        for ld_json_script in tree.iterfind(_LD_JSON_PATH):
+            # Organization/WebSite blocks can be large; only parse blocks that can hold breadcrumbs
+            if not ld_json_script.text or 'BreadcrumbList' not in ld_json_script.text:
+                continue
             try:
-                json_data = json.loads(script_ld_json.string)
-                # Handle case where json_data is a list of schemas or a single schema
-                schemas = json_data if isinstance(json_data, list) else [json_data]
-                for schema in schemas:
-                    if schema.get('@type') == 'BreadcrumbList' and 'itemListElement' in schema:
-                        for item in schema['itemListElement']:
-                            if item.get('@type') == 'ListItem' and 'item' in item and 'name' in item['item']:
-                                breadcrumbs_list.append(item['item']['name'].strip())
-                        break # Found BreadcrumbList
-            except json.JSONDecodeError:
+                json_data = orjson.loads(ld_json_script.text)
+            except orjson.JSONDecodeError:
                 print(f"Warning: Could not parse JSON-LD in {html_filepath_abs}")
+                continue
+            # Handle case where json_data is a list of schemas or a single schema
+            schemas = json_data if isinstance(json_data, list) else [json_data]
+            breadcrumb_schema = next(
+                (schema for schema in schemas
+                 if isinstance(schema, dict) and schema.get('@type') == 'BreadcrumbList'
+                 and 'itemListElement' in schema),
+                None
+            )
+            if breadcrumb_schema is not None:
+                breadcrumbs_list = [
+                    item['item']['name'].strip()
+                    for item in breadcrumb_schema['itemListElement']
+                    if item.get('@type') == 'ListItem' and 'item' in item and 'name' in item['item']
+                ]
+                break # Found BreadcrumbList
 
         # Attempt to extract content using TYPO3SEARCH comments
-        typo3_search_content = None
-        # Use a non-greedy match for content between the comments
-        match = re.search(r'<!--TYPO3SEARCH_begin-->(.*?)<!--TYPO3SEARCH_end-->', html_string, re.DOTALL | re.IGNORECASE)
-        if match:
-            content_html_str = match.group(1)
-            content_soup = BeautifulSoup(content_html_str, 'html.parser')
-            typo3_search_content = content_soup
-
-        main_content_element = None
-        if typo3_search_content:
-            main_content_element = typo3_search_content
-        else:
+        main_content_element = typo3_search_content
+        if main_content_element is None:
             # Fallback to <main class="c-page__content">
-            main_content_tag = soup.find('main', class_='c-page__content')
-            if main_content_tag:
-                main_content_element = main_content_tag
+            main_content_tags = _MAIN_CONTENT_XPATH(tree)
+            if main_content_tags:
+                main_content_element = main_content_tags[0]
             else:
                 # Fallback to the whole body if no specific main content found
                 # This is less ideal as it might include headers/footers if not careful
                 # but TYPO3SEARCH or main.c-page__content should be the primary targets
                 print(f"Warning: Neither TYPO3SEARCH comments nor <main class='c-page__content'> found in {html_filepath_abs}. Considering body.")
-                main_content_element = soup.body # Or None, if we want to be stricter
+                main_content_element = tree.find('body') # Or None, if we want to be stricter
 
         cleaned_text = "No main content extracted"
         main_heading = ""
 
-        if main_content_element:
+        if main_content_element is not None:
             # Extract Main Heading (H1) from the main content element
-            h1_tag = main_content_element.find('h1')
-            if h1_tag and h1_tag.string:
-                main_heading = h1_tag.string.strip()
-            elif h1_tag and h1_tag.get_text(strip=True): # Handle cases where H1 might contain other tags
-                main_heading = h1_tag.get_text(separator=' ', strip=True)
+            h1_tag = main_content_element.find('.//h1')
+            if h1_tag is not None:
+                main_heading = get_element_text(h1_tag)
 
             # Remove script and style tags from the extracted main content
-            for script_or_style in main_content_element.find_all(['script', 'style']):
-                script_or_style.decompose()
+            for script_or_style in list(main_content_element.iter('script', 'style')):
+                script_or_style.drop_tree() # Keeps the text that follows the tag
             
             # Get text, separating by space, and stripping leading/trailing whitespace from lines
-            cleaned_text = main_content_element.get_text(separator=' ', strip=True)
+            cleaned_text = get_element_text(main_content_element)
         
         # Create a source link relative to the project_root_dir
         source_link = os.path.relpath(html_filepath_abs, project_root_dir)
@@ -99,33 +210,87 @@ def extract_content_from_html(html_filepath_abs, project_root_dir):
         print(f"Error processing file {html_filepath_abs}: {e}")
         return None
 
-def generate_content_hash(content):
+def normalize_content(content):
+    """
+    Lowercases the content and collapses runs of whitespace, as used for duplicate detection.
+    """
+    return _WHITESPACE_RE.sub(' ', content.lower()).strip()
+
+def generate_content_hash(content, is_normalized=False):
     """
     Generate a stable hash for content to detect duplicates.
     This is more reliable than Python's built-in hash() which is randomized between sessions.
+    Pass is_normalized=True if the content already went through normalize_content.
     """
     # Normalize the content by lowercasing and stripping excessive whitespace
-    normalized = re.sub(r'\s+', ' ', content.lower()).strip()
-    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+    normalized = content if is_normalized else normalize_content(content)
+    # Non-cryptographic: the hash is only a duplicate key, so XXH3 replaces MD5
+    return xxhash.xxh3_128_hexdigest(normalized.encode('utf-8'))
 
-def calculate_text_similarity(text1, text2):
+def calculate_text_similarity(text1, text2, is_normalized=False, min_ratio=0.0, matcher=None):
     """
     Calculate similarity between two text strings using difflib's SequenceMatcher.
     Returns a float between 0 and 1, where 1 means identical.
+    Pass is_normalized=True if both texts already went through normalize_content.
+    With min_ratio set, pairs that cannot reach it return early with an upper
+    bound of their similarity (still below min_ratio) instead of the exact ratio.
+    matcher may be a SequenceMatcher whose second sequence is text2 (as passed);
+    it is reused so text2's index is not rebuilt for every comparison.
     """
     # Normalize the texts (lowercase and remove extra whitespace)
-    text1 = re.sub(r'\s+', ' ', text1.lower()).strip()
-    text2 = re.sub(r'\s+', ' ', text2.lower()).strip()
-    
+    if not is_normalized:
+        text1 = normalize_content(text1)
+        text2 = normalize_content(text2)
+
+    if text1 == text2:
+        return 1.0
+
+    # ratio() is at most 2 * min(len) / (len1 + len2)
+    total_length = len(text1) + len(text2)
+    upper_bound = 2 * min(len(text1), len(text2)) / total_length
+    if upper_bound < min_ratio:
+        return upper_bound
+
     # Use SequenceMatcher to calculate similarity ratio
-    similarity = difflib.SequenceMatcher(None, text1, text2).ratio()
+    if matcher is None:
+        matcher = difflib.SequenceMatcher(None, text1, text2)
+    else:
+        matcher.set_seq1(text1)
+    if min_ratio:
+        # Character-count bound, linear time, before the full matching
+        upper_bound = matcher.quick_ratio()
+        if upper_bound < min_ratio:
+            return upper_bound
+    similarity = matcher.ratio()
     return similarity
 
-def generate_markdown_output(all_data, ids_to_remove):
+# Near-duplicate candidates come from MinHash LSH over character shingles; each
+# candidate is then confirmed with calculate_text_similarity. The LSH threshold
+# (estimated Jaccard) is deliberately below SIMILARITY_THRESHOLD: one edited word
+# changes several shingles, so true near-duplicates score well under 0.95 here.
+SHINGLE_SIZE = 5
+MINHASH_NUM_PERM = 128
+LSH_CANDIDATE_THRESHOLD = 0.4
+
+def build_minhash(normalized):
+    """
+    Builds a MinHash signature over the character shingles of already normalized content.
+    Character shingles (rather than word n-grams) keep short documents comparable.
+    """
+    shingles = {normalized[i:i + SHINGLE_SIZE].encode('utf-8')
+                for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+    minhash = MinHash(num_perm=MINHASH_NUM_PERM)
+    minhash.update_batch(list(shingles))
+    return minhash
+
+def write_markdown_output(all_data, ids_to_remove, fh):
     """
-    Generates a clean markdown file containing only document numbers and consolidated text.
+    Streams a clean markdown document containing only document numbers and
+    consolidated text to the open file handle, one entry at a time.
+    Returns the number of documents written.
     """
-    markdown_lines = []
+    written_count = 0
+    separator = ""
 
     # Add progress bar for markdown generation
     for i, data in tqdm(enumerate(all_data), desc="Generating markdown entries", unit="doc", total=len(all_data)):
@@ -133,8 +298,6 @@ def generate_markdown_output(all_data, ids_to_remove):
             tqdm.write(f"Filtering out document: {i+1} ('{data.get('title', '')}')")
             continue
         
-        markdown_lines.append(f"## Document {i+1}")
-        
         # Consolidate all text content
         title = data.get('title', '')
         main_heading = data.get('main_heading', '')
@@ -146,15 +309,21 @@ def generate_markdown_output(all_data, ids_to_remove):
         full_content_parts = [part for part in [title, main_heading, breadcrumbs_str, body_content] if part and part.strip()]
         merged_content = " ".join(full_content_parts)
 
-        markdown_lines.append(merged_content)
-        markdown_lines.append("")
+        # Entries are separated by a blank line
+        fh.write(f"{separator}## Document {i+1}\n")
+        fh.write(merged_content)
+        fh.write("\n")
+        separator = "\n"
+        written_count += 1
 
-    return "\n".join(markdown_lines)
+    return written_count
 
 
-def generate_metadata_output(all_data, ids_to_remove):
+def write_metadata_output(all_data, ids_to_remove, fh):
     """
-    Generates a JSON file with metadata for each document.
+    Writes the metadata of each document as UTF-8 encoded JSON (2-space indent)
+    to the open binary file handle.
+    Returns the number of documents written.
     """
     metadata_list = []
 
@@ -183,7 +352,8 @@ def generate_metadata_output(all_data, ids_to_remove):
 
         metadata_list.append(doc_metadata)
 
-    return json.dumps(metadata_list, indent=4, ensure_ascii=False)
+    fh.write(orjson.dumps(metadata_list, option=orjson.OPT_INDENT_2))
+    return len(metadata_list)
 
 
 def extract_and_clean_book_metadata(content):
@@ -191,18 +361,10 @@ def extract_and_clean_book_metadata(content):
     Extracts book metadata from a sentence at the end of the content
     and returns the metadata and the cleaned content.
     """
-    # This regex is designed to find the specific sentence structure.
-    book_info_pattern = re.compile(
-        r"\s*(Speicherprogrammierbare Steuerungen.*?)\s+"
-        r"(\d+\.\s*Auflage)\s+"
-        r"erschienen im\s+(.*?)\s*,?\s*"
-        r"(\d{4})\s*$"
-    )
-
     book_metadata = {}
     cleaned_content = content
     
-    match = book_info_pattern.search(content)
+    match = _BOOK_INFO_RE.search(content)
     
     if match:
         book_metadata = {
@@ -211,12 +373,51 @@ def extract_and_clean_book_metadata(content):
             "publisher": match.group(3).strip(),
             "publication_date": match.group(4).strip(),
         }
-        # Use re.sub for a safe replacement of the matched pattern
-        cleaned_content = book_info_pattern.sub("", content).strip()
+        # Cut out the match found above instead of searching the content a second time
+        cleaned_content = (content[:match.start()] + content[match.end():]).strip()
         
     return book_metadata, cleaned_content
 
-def main(output_format: str = "markdown"):
+def iter_html_files(root_dir):
+    """
+    Yields the paths of all .html files under root_dir, in the same order as os.walk.
+    Uses os.scandir directly: the entries already carry their path and file type,
+    so no extra os.path.join or stat call is needed per file.
+    """
+    sub_dirs = []
+    try:
+        with os.scandir(root_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_dirs.append(entry.path)
+                elif entry.name.endswith(".html"):
+                    yield entry.path
+    except OSError:
+        return
+    for sub_dir in sub_dirs:
+        yield from iter_html_files(sub_dir)
+
+def prefetch_html_files(paths):
+    """
+    Asks the kernel to start reading the given files into the page cache.
+    posix_fadvise(WILLNEED) only queues the read and returns, so run from a
+    background thread this keeps many reads in flight while the workers parse.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def main(output_format: str = "markdown", verbose: bool = False):
     project_root = "."
     html_root_dir_abs = os.path.join(project_root, "www.seitz.et.hs-mannheim.de")
     output_content_file_abs = os.path.join(project_root, "cleaned_content.md")
@@ -227,65 +428,87 @@ def main(output_format: str = "markdown"):
 
     all_extracted_data = []
     seen_contents = set()
-    processed_base_files = set()
     duplicate_count = 0
     similarity_duplicate_count = 0
-    content_map = {}
-
-    html_files = []
-    for root, _, files in os.walk(html_root_dir_abs):
-        for file in files:
-            if file.endswith(".html"):
-                html_files.append(os.path.join(root, file))
-
-    # Use tqdm for progress bar
-    for html_filepath_abs in tqdm(html_files, desc="Extracting content", unit="file"):
-        base_name = os.path.basename(html_filepath_abs)
+    no_cache_skipped_count = 0
+    kept_contents = {} # content hash -> normalized content of each kept document
+    kept_matchers = {} # content hash -> SequenceMatcher with that content as its b side
+    lsh = MinHashLSH(threshold=LSH_CANDIDATE_THRESHOLD, num_perm=MINHASH_NUM_PERM)
+
+    html_files = list(iter_html_files(html_root_dir_abs))
+
+    # File names per directory, so the no-cache check is a set lookup (no stat per file)
+    names_by_dir = defaultdict(set)
+    for html_filepath_abs in html_files:
+        dir_path, base_name = os.path.split(html_filepath_abs)
+        names_by_dir[dir_path].add(base_name)
+
+    # Decide up front which files to parse, so parsing can run in parallel
+    candidate_files = []
+    for html_filepath_abs in html_files:
+        dir_path, base_name = os.path.split(html_filepath_abs)
         is_no_cache_version = '@no_cache=1' in base_name
         
-        # Skip no-cache versions if the base version has been processed
+        # Skip no-cache versions if the base version exists in the same directory
         if is_no_cache_version:
             original_file_name = base_name.split('@no_cache=1')[0]
-            if original_file_name in processed_base_files:
-                tqdm.write(f"Skipping no-cache version: {base_name}")
+            if original_file_name in names_by_dir[dir_path]:
+                no_cache_skipped_count += 1
+                if verbose:
+                    tqdm.write(f"Skipping no-cache version: {base_name}")
                 continue
-        
-        data = extract_content_from_html(html_filepath_abs, project_root)
-        if data and data['content']:
-            content_hash = generate_content_hash(data['content'])
-            if content_hash not in seen_contents:
+        candidate_files.append(html_filepath_abs)
+
+    print(f"Skipped {no_cache_skipped_count} no-cache versions of existing pages.")
+
+    # Overlap disk reads with parsing: the workers then mmap pages already in the cache
+    threading.Thread(target=prefetch_html_files, args=(candidate_files,), daemon=True).start()
+
+    # Parsing is CPU-bound and independent per file; map() keeps the input order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        extracted = executor.map(extract_content_from_html, candidate_files,
+                                 repeat(project_root), chunksize=32)
+        # Duplicate bookkeeping stays in this process and runs as results arrive,
+        # overlapping with the workers still parsing. One pass per document: exact
+        # duplicates by hash, then near-duplicates among the documents kept so far.
+        for data in tqdm(extracted, desc="Extracting and deduplicating content", unit="file",
+                         total=len(candidate_files)):
+            if not (data and data['content']):
+                continue
+            # Normalized exactly once; hashing and the similarity check reuse it
+            normalized = normalize_content(data['content'])
+            content_hash = generate_content_hash(normalized, is_normalized=True)
+            duplicate_count += 1
+            if content_hash in seen_contents:
+                continue
+            seen_contents.add(content_hash)
+
+            # Only LSH candidates are compared, not every kept document
+            minhash = build_minhash(normalized)
+            is_similar = False
+            for seen_hash in lsh.query(minhash):
+                # min_ratio lets pairs that cannot reach the threshold (by length or
+                # character counts) skip the full SequenceMatcher run
+                seen_content = kept_contents[seen_hash]
+                # One matcher per kept document, created when it first becomes a candidate,
+                # so its character index (b2j) is built once rather than per comparison
+                seen_matcher = kept_matchers.get(seen_hash)
+                if seen_matcher is None:
+                    seen_matcher = kept_matchers[seen_hash] = difflib.SequenceMatcher(None, b=seen_content)
+                similarity = calculate_text_similarity(normalized, seen_content, is_normalized=True,
+                                                       min_ratio=SIMILARITY_THRESHOLD, matcher=seen_matcher)
+                if similarity >= SIMILARITY_THRESHOLD:
+                    is_similar = True
+                    similarity_duplicate_count += 1
+                    if verbose:
+                        tqdm.write(f"Found similar document (similarity: {similarity:.2f}). Skipping.")
+                    break
+
+            if not is_similar:
                 all_extracted_data.append(data)
-                seen_contents.add(content_hash)
-                content_map[content_hash] = data['content']
-                duplicate_count += 1
-            else:
-                duplicate_count += 1
-        
-        if not is_no_cache_version:
-            processed_base_files.add(base_name)
-
-    # Second pass for similarity check
-    unique_data = []
-    seen_for_similarity = set()
-    for data in tqdm(all_extracted_data, desc="Checking for similar content", unit="doc"):
-        content_hash = generate_content_hash(data['content'])
-        if content_hash in seen_for_similarity:
-            continue
-
-        is_similar = False
-        for seen_hash in seen_for_similarity:
-            similarity = calculate_text_similarity(content_map[content_hash], content_map[seen_hash])
-            if similarity >= SIMILARITY_THRESHOLD:
-                is_similar = True
-                similarity_duplicate_count += 1
-                tqdm.write(f"Found similar document (similarity: {similarity:.2f}). Skipping.")
-                break
-        
-        if not is_similar:
-            unique_data.append(data)
-            seen_for_similarity.add(content_hash)
+                kept_contents[content_hash] = normalized
+                lsh.insert(content_hash, minhash)
 
-    all_extracted_data = unique_data
     total_duplicates = duplicate_count + similarity_duplicate_count
     print(f"\nProcessed files: {len(all_extracted_data) + total_duplicates}")
     print(f"Filtered out {duplicate_count} exact duplicates and {similarity_duplicate_count} similar documents (similarity >= {SIMILARITY_THRESHOLD}).")
@@ -320,24 +543,20 @@ def main(output_format: str = "markdown"):
         12   # Login
     }
 
-    # The filtering logic has been moved into generate_markdown_output for efficiency.
+    # The filtering logic has been moved into write_markdown_output for efficiency.
     
     # Generate and save both files
     try:
         print("\nGenerating clean content file...")
-        markdown_content = generate_markdown_output(all_extracted_data, ids_to_remove)
-        print("Saving clean content file...")
-        with open(output_content_file_abs, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Written straight to a large-buffered file rather than built in memory first
+        with open(output_content_file_abs, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            final_doc_count = write_markdown_output(all_extracted_data, ids_to_remove, f)
         
-        final_doc_count = markdown_content.count("## Document")
         print(f"Successfully saved {final_doc_count} documents to {output_content_file_abs}")
 
         print("\nGenerating metadata file...")
-        metadata_content = generate_metadata_output(all_extracted_data, ids_to_remove)
-        with open(output_metadata_file_abs, 'w', encoding='utf-8') as f:
-            f.write(metadata_content)
-        metadata_doc_count = len(json.loads(metadata_content))
+        with open(output_metadata_file_abs, 'wb') as f:
+            metadata_doc_count = write_metadata_output(all_extracted_data, ids_to_remove, f)
         print(f"Successfully saved metadata for {metadata_doc_count} documents to {output_metadata_file_abs}")
 
     except Exception as e:
@@ -345,4 +564,8 @@ def main(output_format: str = "markdown"):
 
 
 if __name__ == "__main__":
-    main(output_format="markdown")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extracts and deduplicates the website content for the RAG index.")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Report every skipped no-cache page and similar document, not just the totals.")
+    args = parser.parse_args()
+    main(output_format="markdown", verbose=args.verbose)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from cleaned_website import extract_content_from_html
+
+HEAD = (
+    '<head><title>Page Title</title>'
+    '<link rel="canonical" href="https://example.org/page"></head>'
+)
+
+
+def _extract(tmp_path, body):
+    page = tmp_path / "page.html"
+    page.write_text(f"<html>{HEAD}<body>{body}</body></html>", encoding="utf-8")
+    return extract_content_from_html(str(page), str(tmp_path))
+
+
+def test_page_with_typo3_markers(tmp_path):
+    data = _extract(tmp_path, '<nav>Menu</nav><!--TYPO3SEARCH_begin--><h1>Heading</h1>'
+                              '<p>Marked text</p><!--TYPO3SEARCH_end--><footer>Footer</footer>')
+    assert data["title"] == "Page Title"
+    assert data["canonical_url"] == "https://example.org/page"
+    assert data["main_heading"] == "Heading"
+    assert data["content"] == "Heading Marked text"
+
+
+def test_page_without_markers_uses_main_content(tmp_path):
+    data = _extract(tmp_path, '<nav>Menu</nav><main class="c-page__content">'
+                              '<h1>Heading</h1><p>Main text</p></main>')
+    assert data is not None
+    assert data["title"] == "Page Title"
+    assert data["content"] == "Heading Main text"
+    assert data["source_link"] == "page.html"
+
+
+def test_page_without_markers_or_main_uses_body(tmp_path):
+    data = _extract(tmp_path, '<p>Body text</p><script>var x = 1;</script>')
+    assert data is not None
+    assert data["content"] == "Body text"
+
+
+def test_page_with_markers_in_another_case(tmp_path):
+    data = _extract(tmp_path, '<div><!--typo3search_begin--><p>Marked text</p></div>'
+                              '<div><!--typo3search_end--></div><p>Other</p>')
+    assert data is not None
+    assert data["content"] == "Marked text"